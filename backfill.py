@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from urllib.parse import urljoin, urlsplit
+
+import extract
+from config import Config
+from coordination import coordinator
+from database import db
+from dedup import dedup_filter
+from fetcher import fetcher
+from mirrors import mirror_pool
+
+CHECKPOINT = "backfill"
+MAX_ATTEMPTS = 2      # fetches of one page before it is given up
+LISTING_BACKOFF = 30  # seconds before refetching a failed listing page, times the attempt number
+VISITED_KEPT = 20000  # topic pages remembered in the checkpoint
+VISITED_SAVE_EVERY = 25  # steps between saves of the visited topics, the bulk of the checkpoint
+
+
+def _key(url):
+    """Page URL without its domain, like normalize_url"""
+    parts = urlsplit(url)
+    return parts.path + ("?" + parts.query if parts.query else "")
+
+
+class Backfill:
+    """Catch-up crawl over the forum's paginated listings, run on request by the owner.
+
+    A run keeps a cursor (the next listing page) and a frontier of topic pages to
+    visit. The next listing page is only fetched once the frontier has drained to
+    half of BACKFILL_FRONTIER_SIZE, so it stays bounded however long the forum is;
+    topic pages are fetched CRAWL_CONCURRENCY at a time, and a topic's own later
+    pages join the front of the frontier. Files not posted yet go through the
+    normal dedup checks and are fed to the pipeline at BACKFILL_RATE per minute.
+
+    A run stops when it runs out of pages or hits its request or time budget; the
+    cursor, frontier and visited topics are checkpointed in MongoDB after every
+    step, so /backfill resume carries on where it stopped, and a run cut short by
+    a restart resumes by itself.
+    """
+
+    def __init__(self):
+        self.state = None
+        self.task = None
+        self._stop = False
+        self._deadline = 0.0
+        self._steps = 0
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    async def load(self):
+        self.state = await db.load_checkpoint(CHECKPOINT)
+        return self.state
+
+    @property
+    def interrupted(self):
+        """A run this instance was doing when it last stopped"""
+        if not self.state or self.state["status"] != "running":
+            return False
+        if Config.COORDINATION or Config.INSTANCE_ID:
+            # Several instances share the checkpoint: only the one that ran it resumes it
+            return self.state.get("owner") == coordinator.owner
+        return True  # a lone instance gets a new host-pid owner name on every restart
+
+    def start(self, start_url, parse, submit, notify):
+        """Begin a new run from a listing URL, replacing any earlier checkpoint"""
+        self.state = {
+            "start_url": start_url,
+            "status": "running",
+            "cursor": start_url,
+            "frontier": [],
+            "visited": [],
+            "listing_pages": 0,
+            "topic_pages": 0,
+            "requests": 0,
+            "files_found": 0,
+            "files_queued": 0,
+            "errors": 0,
+            "reason": None,
+        }
+        self._launch(parse, submit, notify)
+
+    def resume(self, parse, submit, notify):
+        """Continue the checkpointed run with a fresh budget; False if there is nothing to resume"""
+        if not self.state or self.state["status"] == "done" or self.running:
+            return False
+        self.state["status"] = "running"
+        self._launch(parse, submit, notify)
+        return True
+
+    def stop(self):
+        """Pause after the current step; the checkpoint keeps the position"""
+        self._stop = True
+
+    async def cancel(self):
+        """Stop at once on shutdown, leaving the run to be resumed on the next start"""
+        if self.running:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    def _launch(self, parse, submit, notify):
+        self._stop = False
+        self.state["owner"] = coordinator.owner  # with several instances, only this one resumes it after a restart
+        self.task = asyncio.create_task(self._run(parse, submit, notify))
+
+    async def _checkpoint(self, frontier, visited, full=False):
+        """Save the position after a step; the visited topics only every VISITED_SAVE_EVERY steps and
+        when the run stops (after a crash, topics visited since are fetched again and their files skipped)"""
+        self.state["frontier"] = list(frontier)
+        self._steps += 1
+        if full or self._steps % VISITED_SAVE_EVERY == 0:
+            self.state["visited"] = list(visited)[-VISITED_KEPT:]
+            await db.save_checkpoint(CHECKPOINT, self.state)
+        else:
+            await db.save_checkpoint(CHECKPOINT, {key: value for key, value in self.state.items() if key != "visited"})
+
+    async def _run(self, parse, submit, notify):
+        state = self.state
+        frontier = deque(state["frontier"])
+        visited = dict.fromkeys(state["visited"])  # insertion-ordered set
+        attempts = {}
+        self._deadline = time.monotonic() + Config.BACKFILL_MAX_SECONDS
+        budget = state["requests"] + Config.BACKFILL_MAX_REQUESTS
+        interval = 60 / max(Config.BACKFILL_RATE, 1)
+        logging.info(f"Backfill running from {state['cursor'] or 'its frontier'} ({len(frontier)} topics pending)")
+
+        try:
+            while True:
+                if self._stop:
+                    state["status"], state["reason"] = "paused", "stopped by owner"
+                    break
+                if state["requests"] >= budget or time.monotonic() >= self._deadline:
+                    state["status"], state["reason"] = "paused", "budget used up"
+                    break
+
+                if state["cursor"] and len(frontier) <= Config.BACKFILL_FRONTIER_SIZE // 2:
+                    await self._listing_page(state, frontier, visited, attempts)
+                elif frontier:
+                    batch = [frontier.popleft() for _ in range(min(
+                        len(frontier), Config.CRAWL_CONCURRENCY, budget - state["requests"]
+                    ))]
+                    await self._topic_pages(batch, state, frontier, visited, attempts, parse, submit, interval)
+                else:
+                    state["status"], state["reason"] = "done", "no pages left"
+                    break
+                await self._checkpoint(frontier, visited)
+        except asyncio.CancelledError:
+            state["reason"] = "bot stopped"  # still "running", so the next start resumes it
+            raise
+        except Exception as e:
+            logging.error(f"Backfill failed: {e}")
+            state["status"], state["reason"] = "paused", f"error: {e}"
+        finally:
+            await self._checkpoint(frontier, visited, full=True)
+
+        logging.info(f"Backfill {state['status']}: {state['reason']}")
+        await notify(f"🗂 **Backfill {state['status']}** ({state['reason']})\n\n{self.summary()}")
+
+    async def _fetch(self, urls):
+        self.state["requests"] += len(urls)
+        return await fetcher.get_many([mirror_pool.rebase(url) for url in urls], timeout=10, stage="backfill_fetch")
+
+    def _retry(self, url, attempts, error):
+        """Put a page back for one more try, or give it up"""
+        attempts[url] = attempts.get(url, 0) + 1
+        if attempts[url] < MAX_ATTEMPTS:
+            return True
+        self.state["errors"] += 1
+        logging.error(f"Backfill gave up on {url}: {error}")
+        return False
+
+    async def _listing_page(self, state, frontier, visited, attempts):
+        url = state["cursor"]
+        [resp] = await self._fetch([url])
+        try:
+            if isinstance(resp, Exception):
+                raise resp
+            resp.raise_for_status()
+            topics = await asyncio.to_thread(extract.topic_links, resp.text)
+            later = await asyncio.to_thread(extract.next_page, resp.text)
+            state["cursor"] = urljoin(url, later) if later else None
+        except Exception as e:
+            attempts[url] = attempts.get(url, 0) + 1
+            if attempts[url] >= MAX_ATTEMPTS:
+                # The next page can't be found without this one: pause here, so resume tries it again
+                raise RuntimeError(f"listing page {url} failed {attempts[url]} times: {e}") from e
+            logging.warning(f"Backfill listing page {url} failed, retrying: {e}")
+            await asyncio.sleep(LISTING_BACKOFF * attempts[url])
+            return
+        state["listing_pages"] += 1
+        pending = set(map(_key, frontier))
+        for href, _ in topics:
+            href = urljoin(url, href)
+            key = _key(href)
+            if key not in visited and key not in pending:
+                frontier.append(href)
+                pending.add(key)
+
+    async def _topic_pages(self, batch, state, frontier, visited, attempts, parse, submit, interval):
+        responses = await self._fetch(batch)
+        found = []
+        for url, resp in zip(batch, responses):
+            try:
+                if isinstance(resp, Exception):
+                    raise resp
+                if resp.status_code == 404:
+                    visited[_key(url)] = None
+                    continue
+                resp.raise_for_status()
+                files = await asyncio.to_thread(parse, resp.text)
+                later = await asyncio.to_thread(extract.next_page, resp.text)
+            except Exception as e:
+                if self._retry(url, attempts, e):
+                    frontier.append(url)
+                continue
+            visited[_key(url)] = None
+            state["topic_pages"] += 1
+            if later:
+                later = urljoin(url, later)
+                if _key(later) not in visited:
+                    frontier.appendleft(later)
+            found.extend((url, file) for file in files)
+
+        if not found:
+            return
+        posted = await dedup_filter.filter_posted({file["normalized_link"] for _, file in found})
+        if posted is None:
+            # Can't tell what was posted: revisit these pages later rather than risk reposting
+            for url in dict.fromkeys(url for url, _ in found):
+                visited.pop(_key(url), None)
+                frontier.append(url)
+            return
+
+        new = [(url, file) for url, file in found if file["normalized_link"] not in posted]
+        state["files_found"] += len(new)
+        for i, (url, file) in enumerate(new):
+            if self._stop or time.monotonic() >= self._deadline:
+                # Visit topics with files left over again on resume; queued ones are skipped then
+                for url in reversed(dict.fromkeys(url for url, _ in new[i:])):
+                    visited.pop(_key(url), None)
+                    frontier.appendleft(url)
+                break
+            # Same job shape as the crawl's; the throttle leaves room for live posts
+            if await submit({"topic_url": url, "topic_title": file["title"], **file}):
+                state["files_queued"] += 1
+                await asyncio.sleep(interval)
+
+    def summary(self):
+        state = self.state
+        if not state:
+            return "No backfill has been run."
+        return (
+            f"• Status: `{state['status']}`" + (f" ({state['reason']})" if state.get("reason") else "") + "\n"
+            f"• Start: `{state['start_url']}`\n"
+            f"• Pages: `{state['listing_pages']}` listings, `{state['topic_pages']}` topics "
+            f"(`{state['requests']}` requests, `{state['errors']}` given up)\n"
+            f"• Frontier: `{len(state['frontier'])}` topics, next listing "
+            f"{'`' + state['cursor'] + '`' if state['cursor'] else 'none'}\n"
+            f"• Files: `{state['files_found']}` not yet posted, `{state['files_queued']}` queued"
+        )
+
+
+# Global backfill instance
+backfill = Backfill()
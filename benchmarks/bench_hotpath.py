@@ -0,0 +1,224 @@
+"""Time the per-cycle hot path: crawl_tbl parsing and the per-file helpers.
+
+Usage:
+    python benchmarks/bench_hotpath.py [--rounds N] [--scale N] [--limit N]
+                                       [--output results.json]
+                                       [--baseline results.json --tolerance 0.25]
+
+crawl_tbl runs against the fixtures in benchmarks/fixtures with the network and
+database mocked: every topic on the homepage is served a copy of the topic
+fixture ("small") or of the fixture with its replies repeated --scale times
+("huge"). "cold" runs start with an empty parse cache, "warm" runs reuse it.
+extract_size, clean_title, normalize_file_url and format_caption are timed
+over the attachments of the huge page, repeated to about 1000 calls;
+"parse_title/uncached" times the title extractor with its memo bypassed.
+
+Results are printed as JSON (mean ms per run, µs per call, peak traced KiB).
+With --baseline, any case slower than the baseline by more than --tolerance
+is reported on stderr and the exit status is 1.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot  # noqa: E402
+import extract  # noqa: E402
+import metadata  # noqa: E402
+from bench_parser import huge_topic, load  # noqa: E402
+from config import Config  # noqa: E402
+from database import db  # noqa: E402
+
+BASE_URL = "https://www.1tamilmv.blue"
+CAPTION_TEMPLATE = "**{title}**\n\n**📦 {size}**\n\n**#1TamilMV | #TamilMV | #TMV**\n\n**🚀 Uploaded By ~ @E4Error**"
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, text):
+        self.text = text
+        self.content = text.encode("utf-8")
+
+    def raise_for_status(self):
+        pass
+
+
+def mock_crawl(homepage, topic, limit):
+    """Serve fixtures instead of the network and an empty posted_files instead of MongoDB"""
+    pages = {}
+
+    def page(url):
+        if url.rstrip("/") == BASE_URL:
+            return FakeResponse(homepage)
+        if url not in pages:
+            # A distinct copy per topic with its own attachment links, so neither the
+            # parse cache nor the per-cycle file dedup can answer for other topics
+            html = topic.replace("attachment.php?id=", f"attachment.php?topic={len(pages)}&amp;id=")
+            pages[url] = FakeResponse(f"{html}<!-- {url} -->")
+        return pages[url]
+
+    async def get(url, timeout=10, **kwargs):
+        return page(url)
+
+    async def get_many(urls, timeout=10, headers_for=None, **kwargs):
+        return [page(url) for url in urls]
+
+    async def get_bot_config(refresh=False):
+        return {"base_url": BASE_URL, "topic_limit": limit}
+
+    async def filter_posted(links):
+        return set()
+
+    bot.fetcher.get = get
+    bot.fetcher.get_many = get_many
+    db.get_bot_config = get_bot_config
+    bot.dedup_filter.filter_posted = filter_posted
+    bot.parse_cache.path = ""
+
+
+def reset_crawl_state(cold):
+    bot.listing_snapshot.previous = {}  # full sweep: every topic is fetched
+    bot.validator_cache._entries.clear()
+    if cold:
+        bot.parse_cache._entries.clear()
+
+
+def measure_crawl(rounds, cold):
+    async def run():
+        reset_crawl_state(cold=True)
+        await bot.crawl_tbl()  # warm-up, and fills the parse cache for warm runs
+
+        reset_crawl_state(cold)
+        tracemalloc.start()
+        torrents = await bot.crawl_tbl()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        elapsed = 0.0
+        for _ in range(rounds):
+            reset_crawl_state(cold)
+            start = time.perf_counter()
+            await bot.crawl_tbl()
+            elapsed += time.perf_counter() - start
+        return elapsed / rounds, peak, len(torrents)
+
+    seconds, peak, topics = asyncio.run(run())
+    return {"mean_ms": seconds * 1000, "peak_kib": peak // 1024, "topics": topics}
+
+
+def measure_calls(func, samples, rounds):
+    tracemalloc.start()
+    for sample in samples:
+        func(*sample)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for sample in samples:
+            func(*sample)
+    seconds = (time.perf_counter() - start) / rounds
+    return {
+        "mean_ms": seconds * 1000,
+        "per_call_us": seconds / len(samples) * 1e6,
+        "calls": len(samples),
+        "peak_kib": peak // 1024,
+    }
+
+
+def measure_caption(samples, rounds):
+    mn_bot = bot.MN_Bot.__new__(bot.MN_Bot)  # only format_caption is used; no Telegram client
+    db.config = {"caption_template": CAPTION_TEMPLATE}
+
+    async def run():
+        tracemalloc.start()
+        for info in samples:
+            await mn_bot.format_caption(info)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for info in samples:
+                await mn_bot.format_caption(info)
+        return (time.perf_counter() - start) / rounds, peak
+
+    seconds, peak = asyncio.run(run())
+    return {
+        "mean_ms": seconds * 1000,
+        "per_call_us": seconds / len(samples) * 1e6,
+        "calls": len(samples),
+        "peak_kib": peak // 1024,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Cases whose mean time grew by more than tolerance over the baseline"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if before and result["mean_ms"] > before["mean_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: {before['mean_ms']:.3f} ms -> {result['mean_ms']:.3f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--scale", type=int, default=25, help="reply repetitions for the huge topic page")
+    parser.add_argument("--limit", type=int, default=30, help="topic_limit used for crawl_tbl")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, as a fraction")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)  # crawl_tbl logs every skipped file
+
+    homepage, topic = load("homepage.html"), load("topic.html")
+    huge = huge_topic(topic, args.scale)
+    results = {}
+    for size, page in (("small", topic), ("huge", huge)):
+        mock_crawl(homepage, page, args.limit)
+        for cold in (True, False):
+            results[f"crawl_tbl/{size}/{'cold' if cold else 'warm'}"] = measure_crawl(args.rounds, cold)
+
+    # Repeat the page's attachments so each helper is timed over enough calls to be stable
+    anchors = extract.torrent_anchors(huge)
+    anchors = anchors * max(1, 1000 // len(anchors))
+    titles = [(text,) for _, text in anchors]
+    results["extract_size"] = measure_calls(bot.extract_size, titles, args.rounds)
+    results["clean_title"] = measure_calls(bot.clean_title, titles, args.rounds)
+    results["normalize_file_url"] = measure_calls(bot.normalize_file_url, [(href,) for href, _ in anchors], args.rounds)
+    results["parse_title/uncached"] = measure_calls(metadata.parse_title.__wrapped__, titles, args.rounds)
+    results["format_caption"] = measure_caption([metadata.parse_title(text) for _, text in anchors], args.rounds)
+
+    report = {
+        "python": platform.python_version(),
+        "html_parser": Config.HTML_PARSER,
+        "rounds": args.rounds,
+        "scale": args.scale,
+        "limit": args.limit,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare the streaming lxml extractor with the BeautifulSoup parser.
+
+Usage:
+    python benchmarks/bench_parser.py [--rounds N] [--scale N] [saved_page.html ...]
+
+Runs both extraction modes over the fixtures in benchmarks/fixtures (plus any
+saved pages given on the command line) and reports mean time per page and
+peak traced memory. --scale builds an extra "huge" topic page by repeating
+the replies of the topic fixture N times.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import extract  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+MODES = ("soup", "stream")
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def huge_topic(html, scale):
+    """Topic page with its reply posts repeated scale times"""
+    first = html.index("<article", html.index("</article>"))
+    last = html.rindex("</article>") + len("</article>")
+    return html[:first] + html[first:last] * scale + html[last:]
+
+
+def measure(func, html, mode, rounds):
+    tracemalloc.start()
+    func(html, mode=mode)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(html, mode=mode)
+    return (time.perf_counter() - start) / rounds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--scale", type=int, default=25)
+    parser.add_argument("--limit", type=int, default=30, help="topic_limit used for homepage pages")
+    parser.add_argument("pages", nargs="*", help="extra saved topic (or homepage*) pages")
+    args = parser.parse_args()
+
+    topic = load("topic.html")
+    cases = [
+        ("homepage", load("homepage.html"), lambda html, mode: extract.topic_links(html, args.limit, mode)),
+        ("topic", topic, extract.torrent_anchors),
+        (f"topic x{args.scale}", huge_topic(topic, args.scale), extract.torrent_anchors),
+    ]
+    for path in args.pages:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            html = f.read()
+        if os.path.basename(path).startswith("homepage"):
+            cases.append((path, html, lambda html, mode: extract.topic_links(html, args.limit, mode)))
+        else:
+            cases.append((path, html, extract.torrent_anchors))
+
+    print(f"{'page':<24}{'size':>10}{'mode':>8}{'ms/page':>10}{'peak KiB':>10}{'speedup':>9}")
+    for name, html, func in cases:
+        results = {mode: measure(func, html, mode, args.rounds) for mode in MODES}
+        for mode in MODES:
+            seconds, peak = results[mode]
+            speedup = results["soup"][0] / seconds
+            print(f"{name[-24:]:<24}{len(html) // 1024:>8}Ki{mode:>8}{seconds * 1000:>10.2f}{peak // 1024:>10}{speedup:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
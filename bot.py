@@ -1,19 +1,39 @@
 import asyncio
+import hashlib
 import logging
 import threading
+import time
 import io
-import re
 from datetime import datetime
 from urllib.parse import urlparse
 
-from flask import Flask
-from bs4 import BeautifulSoup
-import cloudscraper
+import bencodepy
+from flask import Flask, Response
 
 from pyrogram import Client, errors, utils as pyroutils, filters, enums
+from pyrogram.errors import FloodWait
 from config import Config
 import start
 from database import db
+from fetcher import fetcher
+from cache import validator_cache, parse_cache
+import extract
+from metadata import parse_title, render
+from listing import listing_snapshot
+from registry import broken_urls, seen_topics
+from dedup import dedup_filter
+from writebuffer import write_buffer
+from thumbnail import thumbnail_cache
+from scheduler import crawl_scheduler
+from mirrors import mirror_pool
+from retry import retry_engine
+from coordination import coordinator
+from backfill import backfill
+from metrics import metrics, stage_seconds, posts_total, duplicates_total, not_found_total
+from profiler import cycle_profiler
+from tracing import CycleTrace, job_timer, trace_log
+from pipeline import Pipeline
+from ratelimit import send_limiter
 
 # Ensure proper chat/channel ID handling
 pyroutils.MIN_CHAT_ID = -999999999999
@@ -30,40 +50,43 @@ app = Flask(__name__)
 def home():
     return "Bot is running!"
 
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+# Counters kept by the caches and the send limiter, read at scrape time
+metrics.counter(
+    "tmv_cache_hits_total", "Pages answered without parsing, by cache", label="cache",
+    func=lambda: {"parse": parse_cache.stats["hits"], "not_modified": validator_cache.stats["not_modified"]}
+)
+metrics.counter("tmv_cache_misses_total", "Pages that had to be parsed", func=lambda: parse_cache.stats["misses"])
+metrics.counter(
+    "tmv_dedup_filter_skipped_lookups_total", "posted_files lookups the Bloom filter made unnecessary",
+    func=lambda: dedup_filter.stats["skipped_lookups"]
+)
+metrics.counter("tmv_floodwaits_total", "FloodWait errors returned by Telegram", func=lambda: send_limiter.flood_waits)
+metrics.gauge(
+    "tmv_mirror_latency_seconds", "Smoothed homepage latency of each probed mirror", label="mirror",
+    func=lambda: {m: e["latency"] for m, e in mirror_pool.state.items() if e["latency"] is not None}
+)
+metrics.gauge(
+    "tmv_mirror_up", "1 while a mirror answers its probes and crawl fetches", label="mirror",
+    func=lambda: {m: int(e["healthy"]) for m, e in mirror_pool.state.items()}
+)
+metrics.counter("tmv_mirror_switches_total", "Times the crawl moved to a different mirror", func=lambda: mirror_pool.switches)
+
 # Run Flask in a separate thread
 def run_flask():
     app.run(host='0.0.0.0', port=8000)
 
-# Utility to extract size from text
+# Utility to extract size from text, e.g. "1.2GB"; bitrates like 128kbps are not sizes
 def extract_size(text):
-    # Match sizes like 1.2GB, 700 MB, 512KB but avoid bitrate tokens like 128kbps/mbps/gbps
-    match = re.search(r"\b(\d+(?:\.\d+)?\s*(?:GB|MB|KB))\b", text, re.IGNORECASE)
-    return match.group(1) if match else "Unknown"
+    return parse_title(text).size
 
 # Utility to clean title for display
 def clean_title(raw_title):
-    """Clean title by removing leading domain prefixes and trailing .torrent suffix"""
-    title = (raw_title or "").strip()
-
-    # Remove any leading domain pattern like:
-    #   www.1tamilmv.blue - ...
-    #   1tamilmv.se - ...
-    #   www.tamilmv.boo - ...
-    # Also tolerate http/https and various dash characters
-    title = re.sub(
-        r'^\s*(?:https?://)?(?:www\.)?(?:[a-z0-9-]+\.)+[a-z]{2,}\s*[-–—]\s*',
-        '',
-        title,
-        flags=re.IGNORECASE,
-    )
-
-    # Remove a single trailing .torrent (case-insensitive) if present
-    title = re.sub(r'\.torrent\s*$', '', title, flags=re.IGNORECASE)
-
-    # Collapse duplicate spaces
-    title = re.sub(r'\s{2,}', ' ', title).strip()
-
-    return title
+    """Clean title by removing leading domain prefixes (www.1tamilmv.blue - ...) and trailing .torrent suffix"""
+    return parse_title(raw_title).title
 
 # Utility to normalize URLs by removing domain
 def normalize_url(url):
@@ -97,11 +120,58 @@ def normalize_file_url(url):
         # If parsing fails, return original URL
         return url
 
-# Global variable to track broken URLs
-broken_urls = set()
+# Infohash of a .torrent: SHA-1 of its bencoded info dictionary, the same under any link or mirror
+def torrent_infohash(content):
+    info = bencodepy.decode(content)[b"info"]
+    return hashlib.sha1(bencodepy.encode(info)).hexdigest()
+
+# Parse the homepage into [topic link, marker text] pairs, in page order
+def parse_topic_listing(html, limit=None):
+    return extract.topic_links(html, limit)
+
+# Parse a topic page into its torrent attachments (raw titles, no dedup applied)
+def parse_topic_files(html):
+    file_links = []
+    for href, raw_text in extract.torrent_anchors(html):
+        if not href:
+            continue
+        link = href.strip()
+        file_links.append({
+            "type": "torrent",
+            "title": raw_text,  # Raw title - will clean just before upload
+            "link": link,
+            # Normalize file URL for domain-independent duplicate detection
+            "normalized_link": normalize_file_url(link),
+            "size": extract_size(raw_text)
+        })
+    return file_links
+
+# Parse a response, reusing a cached result when the page is unmodified (304) or byte-identical
+async def parse_cached(url, resp, parser, *args):
+    if resp.status_code == 304:
+        digest = validator_cache.digest(url)
+        parsed = parse_cache.get(f"{parser.__name__}{args}:{digest}") if digest else None
+        if parsed is not None:
+            return parsed
+        # Cached result was evicted meanwhile - fetch the full page again
+        validator_cache.forget(url)
+        resp = await fetcher.get(url, timeout=10)
+    resp.raise_for_status()
+    digest = hashlib.sha1(resp.content).hexdigest()
+    validator_cache.store(url, resp, digest)
+    key = f"{parser.__name__}{args}:{digest}"
+    parsed = parse_cache.get(key)
+    if parsed is None:
+        with stage_seconds.time("parse"):
+            parsed = await asyncio.to_thread(parser, resp.text, *args)
+        parse_cache.put(key, parsed)
+    return parsed
 
 # Crawl 1TamilMV for torrent files, returning topic URL + its files
-async def crawl_tbl(posted_files=None):
+# posted_files holds extra normalized links to treat as posted (e.g. ones not yet saved to the database)
+# trace collects per-topic timings for the cycle trace log
+# on_topic(torrent) is awaited as soon as each topic's new files are known, before the rest of the crawl finishes
+async def crawl_tbl(posted_files=None, trace=None, on_topic=None):
     # Get config from database
     config = await db.get_bot_config()
     base_url = config["base_url"] if config and "base_url" in config else None
@@ -113,87 +183,119 @@ async def crawl_tbl(posted_files=None):
     # Use empty set if no posted_files provided
     if posted_files is None:
         posted_files = set()
+    trace = trace or CycleTrace()
     
     torrents = []
-    scraper = cloudscraper.create_scraper()
 
     try:
-        resp = scraper.get(base_url, timeout=10)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        topic_links = [
-            a["href"] for a in soup.find_all("a", href=re.compile(r'/forums/topic/'))
-            if a.get("href")
-        ]
-        # dedupe and limit to configured number of topics
-        for rel_url in list(dict.fromkeys(topic_links))[:topic_limit]:
+        # Fastest healthy mirror, failing over to the next one within this cycle
+        with trace.span("homepage_fetch"):
+            mirror, resp = await mirror_pool.fetch_homepage(base_url, stage="homepage_fetch")
+        trace.record(mirror=mirror)
+        # deduped and limited to the configured number of topics
+        with trace.span("homepage_parse"):
+            listing = await parse_cached(mirror, resp, parse_topic_listing, topic_limit)
+
+        entries = []
+        topic_urls = {}
+        for rel_url, marker in listing:
+            # The listing may be cached from another mirror - always fetch from this one
+            full_url = mirror_pool.rebase(rel_url, mirror)
+            key = normalize_url(full_url)
+            # Skip if this URL is known to be broken
+            if key in broken_urls:
+                continue
+            entries.append((key, marker))
+            topic_urls[key] = full_url
+
+        # Only fetch topics that are new or changed since the last cycle
+        changed = listing_snapshot.changed(entries)
+        fetch_keys = [key for key, _ in entries if key in changed]
+        failed_keys = set()
+        found = set()  # files taken this cycle, as topics can share attachments
+        topic_traces = {key: {"url": topic_urls[key]} for key in fetch_keys}
+
+        async def crawl_topic(key):
+            full_url = topic_urls[key]
+            topic_trace = topic_traces[key]
             try:
-                full_url = rel_url if rel_url.startswith("http") else base_url + rel_url
-                
-                # Skip if this URL is known to be broken
-                if full_url in broken_urls:
-                    continue
-                dresp = scraper.get(full_url, timeout=10)
-                
+                dresp = await fetcher.get(full_url, timeout=10, headers=validator_cache.headers(full_url), stage="topic_fetch")
+                topic_trace["status"] = dresp.status_code
+                if getattr(dresp, "elapsed", None) is not None:
+                    topic_trace["fetch_ms"] = round(dresp.elapsed.total_seconds() * 1000, 2)
+
                 # Check if the page exists (not 404)
                 if dresp.status_code == 404:
                     logging.info(f"Skipping 404 topic: {full_url}")
-                    broken_urls.add(full_url)  # Remember this broken URL
-                    continue
-                    
-                dresp.raise_for_status()
-                post_soup = BeautifulSoup(dresp.text, "html.parser")
-
-                torrent_tags = post_soup.find_all("a", attrs={"data-fileext": "torrent"})
-                file_links = []
-                for tag in torrent_tags:
-                    href = tag.get("href")
-                    if not href:
-                        continue
-                    link = href.strip()
-                    raw_text = tag.get_text(strip=True)
-                    
-                    # Normalize file URL for domain-independent duplicate detection
-                    normalized_link = normalize_file_url(link)
-                    
-                    # Log file URL patterns for debugging (only first few times)
-                    if len(posted_files) < 5:  # Only log during initial startup
-                        logging.info(f"File URL pattern: {link} -> {normalized_link}")
-                    
-                    # Check if this file is already posted using normalized URL
-                    if normalized_link in posted_files:
-                        # Skip already posted files
-                        logging.info(f"Skipping duplicate: {raw_text} (normalized: {normalized_link})")
-                        continue
-                    
-                    # Store raw title - will clean just before upload
-                    title = raw_text
-                    size = extract_size(raw_text)
-
-                    file_links.append({
-                        "type": "torrent",
-                        "title": title,  # Raw title
-                        "link": link,
-                        "normalized_link": normalized_link,
-                        "size": size
-                    })
-
-                if file_links:
-                    torrents.append({
-                        "topic_url": full_url,
-                        "title": file_links[0]["title"],
-                        "size": file_links[0]["size"],
-                        "links": file_links
-                    })
+                    await broken_urls.add(key)  # Remember this broken URL
+                    not_found_total.inc()
+                    return
+
+                parse_start = time.perf_counter()
+                all_links = await parse_cached(full_url, dresp, parse_topic_files)
+                topic_trace["parse_ms"] = round((time.perf_counter() - parse_start) * 1000, 2)
+                topic_trace["files"] = len(all_links)
+                if not all_links:
+                    return
+
+                # One indexed lookup for the topic's files
+                lookup_start = time.perf_counter()
+                already_posted = await dedup_filter.filter_posted({file["normalized_link"] for file in all_links})
+                topic_trace["lookup_ms"] = round((time.perf_counter() - lookup_start) * 1000, 2)
 
             except Exception as post_err:
-                logging.error(f"Failed to parse TBL topic {rel_url}: {post_err}")
-                continue  # Continue to next topic instead of stopping
+                logging.error(f"Failed to parse TBL topic {full_url}: {post_err}")
+                topic_trace["error"] = str(post_err)
+                failed_keys.add(key)  # Fetch it again next cycle
+                return  # Continue with the other topics instead of stopping
+
+            if already_posted is None:
+                # Can't tell what was posted - retry this topic next cycle rather than risk reposting
+                failed_keys.add(key)
+                return
+
+            file_links = []
+            for file in all_links:
+                normalized_link = file["normalized_link"]
+
+                # Check if this file is already posted using normalized URL
+                if normalized_link in already_posted or normalized_link in posted_files or normalized_link in found:
+                    # Skip already posted files
+                    logging.info(f"Skipping duplicate: {file['title']} (normalized: {normalized_link})")
+                    duplicates_total.inc(label_value="url")
+                    continue
+                found.add(normalized_link)
+
+                # copy - the cached parse result is shared
+                file_links.append(dict(file, link=mirror_pool.rebase(file["link"], mirror)))
+
+            topic_trace["new_files"] = len(file_links)
+            if file_links:
+                torrent = {
+                    "topic_url": full_url,
+                    "title": file_links[0]["title"],
+                    "size": file_links[0]["size"],
+                    "links": file_links
+                }
+                torrents.append(torrent)
+                if on_topic is not None:
+                    await on_topic(torrent)
+
+        # Topic pages are fetched concurrently (bounded by the fetcher) and handed on as each one is parsed,
+        # so files reach the channel in the order they are ready rather than homepage order
+        with trace.span("topics"):
+            await asyncio.gather(*(crawl_topic(key) for key in fetch_keys))
+
+        listing_snapshot.update(entries, failed_keys)
+        for topic_trace in topic_traces.values():
+            trace.topic(**topic_trace)
+        trace.record(listed=len(entries), fetched=len(fetch_keys), failed=len(failed_keys))
 
     except Exception as e:
         logging.error(f"Failed to fetch TBL homepage: {e}")
 
+    await parse_cache.save()
+    await dedup_filter.save()
     return torrents
 
 class MN_Bot(Client):
@@ -209,44 +311,64 @@ class MN_Bot(Client):
         )
         self.channel_id = Config.CHANNEL_ID
         self.leech_chat_id = Config.CHAT_ID  # Optional secondary destination for /qbleech commands
-        self.last_posted = set()   # tracks normalized file URLs (domain-independent)
-        self.seen_topics = set()   # tracks which topic URLs have been processed
-        self.thumbnail = None  # will store the thumbnail bytes
-        self.config = None  # will store bot configuration
-        self.stats = {"posts_successful": 0, "posts_failed": 0, "total_scraped": 0}
+        self.last_posted = set()   # normalized file URLs posted but not yet saved to posted_files
+        self.in_flight = set()     # normalized file URLs queued in the pipeline
+        self.in_flight_hashes = {}  # infohash -> normalized link of the copy downloaded and not yet recorded
+        self._background = set()   # fire-and-forget tasks kept alive until done
+        self.seen_topics = seen_topics  # tracks which topic URLs have been processed
+        self.thumbnail = None  # path of the cached thumbnail file
+        # crawl -> download -> upload -> persist, linked by bounded queues
+        self.pipeline = (
+            Pipeline()
+            .add_stage("download", self.download_stage, Config.DOWNLOAD_WORKERS, Config.PIPELINE_QUEUE_SIZE)
+            .add_stage("upload", self.upload_stage, Config.UPLOAD_WORKERS, Config.PIPELINE_QUEUE_SIZE)
+            .add_stage("persist", self.persist_stage, Config.PERSIST_WORKERS, Config.PIPELINE_QUEUE_SIZE)
+        )
+        self._register_metrics()
+
+    def _register_metrics(self):
+        """Gauges read from this instance when /metrics is scraped"""
+        metrics.gauge(
+            "tmv_queue_depth", "Items waiting in front of each pipeline stage", label="stage",
+            func=lambda: {name: d["queued"] for name, d in self.pipeline.depths().items()}
+        )
+        metrics.gauge(
+            "tmv_busy_workers", "Workers currently handling an item, per pipeline stage", label="stage",
+            func=lambda: {name: d["busy"] for name, d in self.pipeline.depths().items()}
+        )
+        metrics.gauge(
+            "tmv_dedup_set_size", "Links held in memory for duplicate detection, by set", label="set",
+            func=lambda: {
+                "in_flight": len(self.in_flight),
+                "in_flight_hashes": len(self.in_flight_hashes),
+                "unsaved": len(self.last_posted),
+                "retry_queue": len(retry_engine.owned),
+                "bloom_filter": dedup_filter.bloom.count if dedup_filter.ready else 0,
+            }
+        )
+        metrics.gauge("tmv_write_buffer_size", "Results waiting to be written to MongoDB", func=lambda: len(write_buffer))
+        metrics.gauge("tmv_crawl_interval_seconds", "Current adaptive crawl interval", func=lambda: crawl_scheduler.interval)
 
     async def safe_send_message(self, chat_id, text, **kwargs):
-        # split overly-long messages
+        # split overly-long messages; the limiter paces chunks to what Telegram allows
         for chunk in (text[i:i+self.MAX_MSG_LENGTH] for i in range(0, len(text), self.MAX_MSG_LENGTH)):
-            await self.send_message(chat_id, chunk, **kwargs)
-            await asyncio.sleep(1)
+            await send_limiter.call(chat_id, self.send_message, chunk, **kwargs)
 
     async def prepare_thumbnail(self):
-        """Download and prepare the thumbnail for file uploads"""
-        try:
-            # Get thumbnail URL from config
-            if self.config:
-                if "thumbnail_url" in self.config:
-                    thumbnail_url = self.config["thumbnail_url"]
-                else:
-                    thumbnail_url = self.THUMBNAIL_URL
-            else:
-                thumbnail_url = self.THUMBNAIL_URL
-                
-            scraper = cloudscraper.create_scraper()
-            resp = scraper.get(thumbnail_url, timeout=10)
-            resp.raise_for_status()
-            self.thumbnail = io.BytesIO(resp.content)
-            logging.info("Thumbnail downloaded successfully")
-        except Exception as e:
-            logging.error(f"Failed to download thumbnail: {e}")
-            self.thumbnail = None
+        """Thumbnail path for uploads; only downloads when thumbnail_url changed in config"""
+        thumbnail_url = (self.config or {}).get("thumbnail_url") or Config.THUMBNAIL_URL
+        self.thumbnail = await thumbnail_cache.get(thumbnail_url)
+        return self.thumbnail
+
+    @property
+    def config(self):
+        """Current bot configuration (the database's cached copy, so edits apply immediately)"""
+        return db.config
 
     async def load_config(self):
         """Load bot configuration from database"""
         try:
-            self.config = await db.get_bot_config()
-            if not self.config:
+            if not await db.get_bot_config(refresh=True):
                 logging.warning("No configuration found, using defaults")
         except Exception as e:
             logging.error(f"Failed to load config: {e}")
@@ -261,113 +383,285 @@ class MN_Bot(Client):
                 return ""
         return "**{title}**\n\n**📦 {size}**\n\n**#1TamilMV | #TamilMV | #TMV**\n\n**🚀 Uploaded By ~ @E4Error**"
 
-    async def format_caption(self, title, size):
-        """Format caption using template, tolerating missing placeholders"""
+    async def format_caption(self, info):
+        """Format caption using template and the title's metadata, tolerating missing placeholders"""
         template = await self.get_caption_template()
-        # Replace only known placeholders; leave any other braces intact
+        # Replace only known placeholders ({title}, {size}, {quality}, ...); leave any other braces intact
         try:
-            caption = template.replace("{title}", title).replace("{size}", size)
+            caption = render(template, info)
         except Exception:
             # Fallback to a minimal caption if something goes wrong
-            caption = f"{title}\n\n{size}"
+            caption = f"{info.title}\n\n{info.size}"
         return caption
 
     async def auto_post_torrents(self):
-        while True:
-            try:
-                torrents = await crawl_tbl(self.last_posted)
-                for t in torrents:
-                    topic = t["topic_url"]
-                    # All files in torrents are already filtered to be new (not posted)
-                    # if we've seen this topic and there are no new files, skip
-                    if topic in self.seen_topics and not t["links"]:
-                        continue
-
-                    # send each new file
-                    for file in t["links"]:
-                        try:
-                            scraper = cloudscraper.create_scraper()
-                            resp = scraper.get(file["link"], timeout=10)
-                            resp.raise_for_status()
-                            file_bytes = io.BytesIO(resp.content)
-                            
-                            # Clean title just before upload
-                            raw_title = file["title"]
-                            cleaned_title = clean_title(raw_title)
-                            
-                            # Log title cleaning
-                            if raw_title != cleaned_title:
-                                logging.info(f"Title cleaned: '{raw_title}' -> '{cleaned_title}'")
-                            
-                            filename = cleaned_title.replace(" ", "_") + ".torrent"
-                            
-                            # Use caption template from config
-                            caption = await self.format_caption(cleaned_title, file["size"])
-                            
-                            await self.send_document(
-                                self.channel_id,
-                                file_bytes,
-                                file_name=filename,
-                                caption=caption,
-                                thumb=self.thumbnail
-                            )
-                            
-                            # Also send the /qbleech command with the original link to secondary chat if configured
-                            try:
-                                if self.leech_chat_id:
-                                    await self.send_message(self.leech_chat_id, f"/qbleech {file['link']}")
-                            except Exception as leech_err:
-                                logging.error(f"Failed to send /qbleech for {file['link']}: {leech_err}")
-                            
-                            # Save posted file to topics collection
-                            await db.add_posted_file_to_topic(
-                                t["topic_url"],
-                                t.get("title", ""),
-                                file["link"],
-                                cleaned_title,  # Store cleaned title
-                                file["size"],
-                                file["normalized_link"]
-                            )
-                            self.last_posted.add(file["normalized_link"])
-                            
-                            # Update stats
-                            self.stats["posts_successful"] += 1
-                            
-                            logging.info(f"Posted TBL: {cleaned_title}")
-                            await asyncio.sleep(3)
-                            
-                        except Exception as e:
-                            logging.error(f"Error sending TBL file {file['link']}: {e}")
-                            
-                            # Save failed post
-                            await db.save_failed_post(
-                                file["link"], 
-                                file["title"],  # Raw title for failed posts
-                                file["size"], 
-                                str(e)
-                            )
-                            
-                            # Update stats
-                            self.stats["posts_failed"] += 1
-
-                    # mark this topic as seen
-                    self.seen_topics.add(topic)
-
-                # Update daily stats
-                await db.update_daily_stats(
-                    posts_successful=self.stats["posts_successful"],
-                    posts_failed=self.stats["posts_failed"],
-                    total_scraped=len(torrents)
+        """Crawl stage: run crawl cycles on the adaptive schedule"""
+        await crawl_scheduler.run(self.traced_cycle)
+
+    async def traced_cycle(self):
+        """One crawl cycle, written to the trace log and profiled when /profile asked for it"""
+        trace = trace_log.new_cycle()
+        cycle_profiler.start_cycle()
+        try:
+            return await self.crawl_cycle(trace)
+        finally:
+            report = cycle_profiler.end_cycle()
+            trace_log.cycle(trace)
+            if report:
+                chat_id, text = report
+                self._run_in_background(self.safe_send_message(chat_id, text))
+
+    async def crawl_cycle(self, trace=None):
+        """Discover new files and feed them to the pipeline topic by topic; returns how many were queued"""
+        queued = 0
+        trace = trace or CycleTrace()
+        enqueue_ms = 0.0
+
+        async def enqueue_topic(t):
+            nonlocal queued, enqueue_ms
+            enqueue_start = time.perf_counter()
+            topic = t["topic_url"]
+            jobs = [{"topic_url": topic, "topic_title": t.get("title", ""), "cycle": trace.cycle, **file} for file in t["links"]]
+            # Shared queue: whichever instance has room leases them; files another instance already has don't count
+            shared = await coordinator.enqueue(jobs) if coordinator.enabled else None
+            if shared is not None:
+                queued += shared
+            else:
+                # queue each new file; blocks while the download queue is full
+                for job in jobs:
+                    if coordinator.enabled:
+                        job["claim"] = True  # still needs the upload mark, so no other instance posts it too
+                    self.in_flight.add(job["normalized_link"])
+                    await self.pipeline.put(job)
+                    queued += 1
+
+            # mark this topic as seen
+            await self.seen_topics.add(normalize_url(topic))
+            enqueue_ms += (time.perf_counter() - enqueue_start) * 1000
+
+        # Files still moving through the pipeline count as posted for dedup
+        torrents = await crawl_tbl(self.last_posted | self.in_flight | retry_engine.owned, trace, enqueue_topic)
+
+        # Written with the next buffer flush, and only if something happened
+        write_buffer.count(total_scraped=len(torrents))
+        trace.spans["enqueue"] = round(enqueue_ms, 2)
+        trace.record(queued=queued)
+
+        depths = ", ".join(f"{name}={d['queued']}" for name, d in self.pipeline.depths().items())
+        logging.info(f"Pipeline queues: {depths}")
+        return queued
+
+    async def _fail_file(self, job, error):
+        """Record a file that could not be posted"""
+        logging.error(f"Error sending TBL file {job['link']}: {error}")
+        self.in_flight.discard(job["normalized_link"])
+        self.in_flight_hashes.pop(job.get("infohash"), None)
+
+        write_buffer.count(posts_failed=1)
+        posts_total.inc(label_value="failed")
+        trace_log.file(job, "failed", error)
+        if "retry_id" in job:
+            await retry_engine.failed_again(job, error)
+        else:
+            # Queue it for retry with the next batch; the crawl leaves it to the retry engine from now on
+            retry_engine.owned.add(job["normalized_link"])
+            write_buffer.add_failed(
+                job["link"],
+                job["title"],  # Raw title for failed posts
+                job["size"],
+                str(error),
+                topic_url=job["topic_url"],
+                topic_title=job["topic_title"],
+                normalized_link=job["normalized_link"],
+                next_attempt_at=retry_engine.next_attempt(0)
+            )
+            if job.get("claim"):
+                # Other instances queue a failed claim again if it has no retry entry, so write it first
+                await write_buffer.flush()
+        if job.get("claim"):
+            coordinator.finished(job, "failed")
+
+    async def download_stage(self, job):
+        """Download stage: fetch the .torrent file"""
+        try:
+            with job_timer(job, "download"):
+                resp = await fetcher.get(job["link"], timeout=10, stage="torrent_download")
+            resp.raise_for_status()
+            job["file_bytes"] = resp.content
+            infohash = torrent_infohash(resp.content)
+        except Exception as e:
+            await self._fail_file(job, e)
+            return None
+
+        # The same release re-attached under another link or mirror has the same infohash
+        if infohash in self.in_flight_hashes:
+            # Check it again next cycle, once the copy in the pipeline has been recorded
+            logging.info(f"Skipping torrent already in the pipeline: {job['title']} ({infohash})")
+            duplicates_total.inc(label_value="infohash")
+            trace_log.file(job, "in_pipeline")
+            if self.in_flight_hashes[infohash] != job["normalized_link"]:
+                self.in_flight.discard(job["normalized_link"])  # the copy in the pipeline still guards its own link
+                if job.get("claim"):
+                    coordinator.drop(job)  # re-leased once the lease runs out, and recorded as a duplicate then
+            return None
+        if await db.is_infohash_posted(infohash):
+            logging.info(f"Skipping duplicate torrent: {job['title']} ({infohash})")
+            duplicates_total.inc(label_value="infohash")
+            job["infohash"] = infohash
+            del job["file_bytes"]
+            self._record_posted(job, clean_title(job["title"]), duplicate=True)
+            return None
+
+        job["infohash"] = infohash
+        self.in_flight_hashes[infohash] = job["normalized_link"]
+        return job
+
+    async def upload_stage(self, job):
+        """Upload stage: send the file to the channel and the /qbleech command"""
+        try:
+            # Clean title just before upload
+            raw_title = job["title"]
+            info = parse_title(raw_title)
+            cleaned_title = info.title
+            
+            # Log title cleaning
+            if raw_title != cleaned_title:
+                logging.info(f"Title cleaned: '{raw_title}' -> '{cleaned_title}'")
+            
+            filename = cleaned_title.replace(" ", "_") + ".torrent"
+            
+            # Use caption template from config
+            caption = await self.format_caption(info)
+            
+            thumb = await self.prepare_thumbnail()
+            await send_limiter.wait(self.channel_id)
+            if job.get("claim") and not await coordinator.start_upload(job):
+                # Our lease ran out and another instance has the file (or posted it)
+                logging.info(f"Skipping {cleaned_title}: claimed by another instance")
+                trace_log.file(job, "lease_lost")
+                self.in_flight.discard(job["normalized_link"])
+                self.in_flight_hashes.pop(job["infohash"], None)
+                return None
+            with stage_seconds.time("telegram_upload"), job_timer(job, "upload"):
+                await self.send_document(
+                    self.channel_id,
+                    io.BytesIO(job["file_bytes"]),
+                    file_name=filename,
+                    caption=caption,
+                    thumb=thumb
                 )
-                
-                # Reset stats for next cycle
-                self.stats = {"posts_successful": 0, "posts_failed": 0, "total_scraped": 0}
+            send_limiter.succeeded(self.channel_id)
+        except FloodWait as e:
+            # Pause only this chat and retry the same file once the wait is over
+            send_limiter.flood_wait(self.channel_id, e.value)
+            if job.get("claim"):
+                await coordinator.hold(job)  # nothing was sent, so don't let the mark pass for an interrupted upload
+            self.pipeline.requeue("upload", job)
+            return None
+        except Exception as e:
+            await self._fail_file(job, e)
+            return None
 
-            except Exception as e:
-                logging.error(f"Error in auto_post_torrents: {e}")
+        # Also send the /qbleech command with the original link to secondary chat if configured
+        if self.leech_chat_id:
+            self._run_in_background(self._send_leech(job["link"]))
 
-            # wait 1 minute before next check
-            await asyncio.sleep(60)
+        del job["file_bytes"]
+        job["cleaned_title"] = cleaned_title
+        logging.info(f"Posted TBL: {cleaned_title}")
+        return job
+
+    async def _send_leech(self, link):
+        """Send /qbleech to the secondary chat; its FloodWaits don't hold up channel uploads"""
+        try:
+            await send_limiter.call(self.leech_chat_id, self.send_message, f"/qbleech {link}")
+        except Exception as leech_err:
+            logging.error(f"Failed to send /qbleech for {link}: {leech_err}")
+
+    def _run_in_background(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def persist_stage(self, job):
+        """Persist stage: record the posted file (only reached after the upload was acknowledged)"""
+        self._record_posted(job, job["cleaned_title"])
+        write_buffer.count(posts_successful=1)
+        posts_total.inc(label_value="posted")
+        if coordinator.enabled:
+            # Other instances only see posted_files, so don't leave the record in the buffer
+            await write_buffer.flush()
+
+    async def submit_retry(self, job):
+        """Feed a leased retry into the pipeline, unless the link is already on its way"""
+        if job["normalized_link"] in self.in_flight | self.last_posted:
+            return  # the lease runs out and the entry is dropped once this copy is recorded
+        self.in_flight.add(job["normalized_link"])
+        job["link"] = mirror_pool.rebase(job["link"])  # the mirror it failed on may be gone
+        job["claim"] = coordinator.enabled
+        await self.pipeline.put(job)
+
+    async def submit_claimed(self, job):
+        """Feed a file leased from the shared queue into the pipeline"""
+        if job["normalized_link"] in self.in_flight | self.last_posted:
+            return  # already on its way here; the claim poll keeps renewing its lease
+        self.in_flight.add(job["normalized_link"])
+        job["link"] = mirror_pool.rebase(job["link"])
+        await self.pipeline.put(job)
+
+    async def submit_backfill(self, job):
+        """Queue a file found by the backfill; False if it is already on its way"""
+        link = job["normalized_link"]
+        if link in self.in_flight | self.last_posted | retry_engine.owned:
+            return False
+        if coordinator.enabled:
+            return bool(await coordinator.enqueue([job]))
+        self.in_flight.add(link)
+        await self.pipeline.put(job)
+        return True
+
+    def backfill_hooks(self):
+        """Topic parser, file sink and owner notification used by backfill runs"""
+        return parse_topic_files, self.submit_backfill, lambda text: self.safe_send_message(Config.BOT_OWNER, text)
+
+    def claim_room(self):
+        """Files to lease now: what the channel's send rate can upload within one lease, less those
+        already waiting here, and no more than the download queue has room for"""
+        depth = self.pipeline.depths()["download"]
+        per_lease = int(send_limiter.bucket(self.channel_id).rate * Config.CLAIM_LEASE_SECONDS)
+        return min(depth["capacity"] - depth["queued"], per_lease - coordinator.waiting)
+
+    def _record_posted(self, job, cleaned_title, duplicate=False):
+        """Buffer the posted_files write; the link stays protected in memory until it is written"""
+        link = job["normalized_link"]
+
+        def written(ok):
+            # A failed write keeps the link in memory so it isn't posted again
+            if ok:
+                self.last_posted.discard(link)
+            else:
+                self.last_posted.add(link)
+            self.in_flight.discard(link)
+            if not duplicate:
+                self.in_flight_hashes.pop(job["infohash"], None)
+            if ok and "retry_id" in job:
+                retry_engine.succeeded(job)
+            if ok and job.get("claim"):
+                coordinator.finished(job, "posted")
+            trace_log.file(job, ("duplicate" if duplicate else "posted") if ok else "write_failed")
+
+        write_buffer.add_posted(
+            job["topic_url"],
+            job["topic_title"],
+            job["link"],
+            cleaned_title,  # Store cleaned title
+            job["size"],
+            link,
+            infohash=job["infohash"],
+            duplicate=duplicate,
+            on_written=written
+        )
+        dedup_filter.add(link)
 
     async def start(self):
         await super().start()
@@ -395,28 +689,23 @@ class MN_Bot(Client):
         
         # Load configuration
         await self.load_config()
+
+        # Restore persisted parse results so unchanged pages skip parsing after a restart
+        parse_cache.load()
         
         # Download thumbnail
         await self.prepare_thumbnail()
         
-        # After connecting to MongoDB
-        posted_files = set()
-        seen_topics = set()
-        # Load posted files from topics collection (only files that were actually posted)
-        async for topic in db.db.topics.find({}, {"topic_url": 1, "files.file_link": 1, "files.normalized_link": 1}):
-            seen_topics.add(topic["topic_url"])
-            for f in topic.get("files", []):
-                # Use normalized link if available, otherwise normalize the file_link
-                if f.get("normalized_link"):
-                    posted_files.add(f["normalized_link"])
-                else:
-                    # For backward compatibility, normalize old file_link
-                    posted_files.add(normalize_file_url(f["file_link"]))
-        self.last_posted = posted_files
-        self.seen_topics = seen_topics
-        
-        # Cleanup old data
-        # await db.cleanup_old_data()
+        # Restore broken URLs and seen topics from before the last restart
+        await broken_urls.load()
+        await self.seen_topics.load()
+        await retry_engine.load()
+
+        # Move posted files out of the old embedded topics.files arrays (runs once)
+        await db.migrate_topic_files(normalize_file_url)
+
+        # Warm-start the optional posted-links filter from its snapshot
+        await dedup_filter.load()
         
         # Register command handlers using decorators
         @self.on_message(filters.command("start"))
@@ -439,6 +728,14 @@ class MN_Bot(Client):
         async def retry_failed_handler(client, message):
             await start.retry_failed_command(client, message)
             
+        @self.on_message(filters.command("profile") & filters.user(Config.BOT_OWNER))
+        async def profile_handler(client, message):
+            await start.profile_command(client, message)
+            
+        @self.on_message(filters.command("backfill") & filters.user(Config.BOT_OWNER))
+        async def backfill_handler(client, message):
+            await start.backfill_command(client, message)
+            
         @self.on_message(filters.command("restart") & filters.user(Config.BOT_OWNER))
         async def restart_handler(client, message):
             await start.restart_command(client, message)
@@ -451,9 +748,32 @@ class MN_Bot(Client):
         async def callback_handler(client, callback_query):
             await start.callback_query_handler(client, callback_query)
         
+        start.set_bot_instance(self)
+        self.pipeline.start()
         asyncio.create_task(self.auto_post_torrents())
+        asyncio.create_task(db.watch_config())
+        asyncio.create_task(write_buffer.run())
+        asyncio.create_task(retry_engine.run(self.submit_retry))
+        asyncio.create_task(mirror_pool.run())
+        if coordinator.enabled:
+            logging.info(f"Coordination on: sharing work as instance {coordinator.owner}")
+            asyncio.create_task(coordinator.run(self.submit_claimed, self.claim_room))
+        # Carry on with a backfill the last shutdown cut short
+        await backfill.load()
+        if backfill.interrupted:
+            backfill.resume(*self.backfill_hooks())
+
+    async def shutdown(self):
+        """Stop background work and save what is still in memory; run before stopping or restarting"""
+        await backfill.cancel()
+        await self.pipeline.stop()
+        await write_buffer.flush()
+        if coordinator.enabled:
+            await coordinator.stop()
+        await dedup_filter.save()
 
     async def stop(self, *args):
+        await self.shutdown()
         await super().stop()
         await db.close()
         logging.info("Bot stopped")
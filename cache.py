@@ -0,0 +1,140 @@
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from config import Config
+
+
+def _page_key(url):
+    """Path, query and fragment of a URL, so validators survive a switch between mirrors"""
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    key = parts.path.rstrip("/") or "/"
+    if parts.query:
+        key += "?" + parts.query
+    if parts.fragment:
+        key += "#" + parts.fragment
+    return key
+
+
+class ValidatorCache:
+    """Per-page HTTP validators (ETag / Last-Modified) and the body digest of the last full response.
+
+    Entries are keyed by the URL without its domain, like posted files, so the
+    same page on another mirror reuses them.
+    """
+
+    def __init__(self, max_entries=2000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.stats = {"not_modified": 0}
+
+    def headers(self, url):
+        """Conditional request headers for a URL we have already parsed"""
+        entry = self._entries.get(_page_key(url))
+        if not entry:
+            return {}
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def digest(self, url):
+        """Body digest of the last full response for a URL (used on 304)"""
+        key = _page_key(url)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self.stats["not_modified"] += 1
+        return entry["digest"]
+
+    def forget(self, url):
+        self._entries.pop(_page_key(url), None)
+
+    def store(self, url, resp, digest):
+        """Remember validators and body digest from a full (200) response"""
+        key = _page_key(url)
+        self._entries[key] = {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "digest": digest,
+        }
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class ParseCache:
+    """LRU of parse results keyed by page content digest, optionally persisted to a JSON file"""
+
+    def __init__(self, max_entries=None, path=None):
+        self.max_entries = max_entries or Config.PARSE_CACHE_SIZE
+        self.path = Config.PARSE_CACHE_PATH if path is None else path
+        self._entries = OrderedDict()
+        self._dirty = False
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        parsed = self._entries.get(key)
+        if parsed is None:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return parsed
+
+    def put(self, key, parsed):
+        self._entries[key] = parsed
+        self._entries.move_to_end(key)
+        self._dirty = True
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def load(self):
+        """Load persisted entries from disk, if persistence is enabled"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for key, parsed in json.load(f):
+                    self.put(key, parsed)
+            self._dirty = False
+            logging.info(f"Loaded {len(self._entries)} cached parse results from {self.path}")
+        except Exception as e:
+            logging.error(f"Failed to load parse cache: {e}")
+
+    def _write(self, entries):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+
+    async def save(self):
+        """Write entries to disk (oldest first) if anything changed since the last save"""
+        if not self.path or not self._dirty:
+            return
+        # Snapshot on the event loop; the file is written from a worker thread
+        entries = list(self._entries.items())
+        self._dirty = False
+        try:
+            await asyncio.to_thread(self._write, entries)
+        except Exception as e:
+            self._dirty = True
+            logging.error(f"Failed to save parse cache: {e}")
+
+
+# Global cache instances
+validator_cache = ValidatorCache()
+parse_cache = ParseCache()
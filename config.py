@@ -15,3 +15,49 @@ class Config:
     CHANNEL_ID = int(environ.get("CHANNEL_ID", "0"))  # main channel/group to post documents
     CHAT_ID = int(environ.get("CHAT_ID", "0"))        # secondary chat for /qbleech commands
     TOPIC_LIMIT = int(environ.get("TOPIC_LIMIT", "0"))
+    THUMBNAIL_URL = environ.get("THUMBNAIL_URL", "https://pbs.twimg.com/profile_images/1672203006232924161/B6aInkS9_400x400.jpg")
+    THUMBNAIL_DIR = environ.get("THUMBNAIL_DIR", "thumbnails")  # downloaded thumbnail, named by content hash
+    CRAWL_CONCURRENCY = int(environ.get("CRAWL_CONCURRENCY", "4"))      # max topic pages fetched at once
+    CRAWL_HOST_DELAY = float(environ.get("CRAWL_HOST_DELAY", "0.25"))   # min seconds between requests to one host
+    CRAWL_MIN_INTERVAL = int(environ.get("CRAWL_MIN_INTERVAL", "30"))   # seconds between crawls while releases are flowing
+    CRAWL_MAX_INTERVAL = int(environ.get("CRAWL_MAX_INTERVAL", "600"))  # seconds between crawls after a long idle stretch
+    MIRRORS = [m.strip() for m in environ.get("MIRRORS", "").split(",") if m.strip()]  # extra forum domains to fail over to
+    MIRROR_PROBE_INTERVAL = int(environ.get("MIRROR_PROBE_INTERVAL", "300"))  # seconds between mirror latency probes
+    HTTP_POOL_CONNECTIONS = int(environ.get("HTTP_POOL_CONNECTIONS", "10"))  # hosts kept in the connection pool
+    HTTP_POOL_MAXSIZE = int(environ.get("HTTP_POOL_MAXSIZE", "10"))          # keep-alive connections per host
+    DNS_CACHE_TTL = int(environ.get("DNS_CACHE_TTL", "300"))                 # seconds; 0 disables DNS caching
+    PARSE_CACHE_SIZE = int(environ.get("PARSE_CACHE_SIZE", "2000"))   # parsed pages kept in memory
+    PARSE_CACHE_PATH = environ.get("PARSE_CACHE_PATH", "")            # JSON file to persist them; empty keeps memory only
+    HTML_PARSER = environ.get("HTML_PARSER", "stream")  # "stream" (lxml, early-terminating) or "soup" (BeautifulSoup)
+    FULL_SWEEP_EVERY = int(environ.get("FULL_SWEEP_EVERY", "30"))  # cycles between full topic sweeps; 1 fetches every topic each cycle
+    REGISTRY_MAX_ENTRIES = int(environ.get("REGISTRY_MAX_ENTRIES", "10000"))  # per registry, kept in memory
+    BROKEN_URL_TTL_DAYS = int(environ.get("BROKEN_URL_TTL_DAYS", "7"))        # how long a 404 topic is skipped
+    SEEN_TOPIC_TTL_DAYS = int(environ.get("SEEN_TOPIC_TTL_DAYS", "30"))       # how long a processed topic is remembered
+    DEDUP_FILTER = environ.get("DEDUP_FILTER", "false").lower() == "true"           # Bloom filter in front of posted_files
+    DEDUP_FILTER_CAPACITY = int(environ.get("DEDUP_FILTER_CAPACITY", "1000000"))    # links sized for at the target error rate
+    DEDUP_FILTER_ERROR_RATE = float(environ.get("DEDUP_FILTER_ERROR_RATE", "0.001"))
+    DEDUP_FILTER_PATH = environ.get("DEDUP_FILTER_PATH", "dedup_filter.bin")        # snapshot file for warm starts
+    CONFIG_POLL_INTERVAL = int(environ.get("CONFIG_POLL_INTERVAL", "30"))  # seconds between config version checks; 0 disables
+    DOWNLOAD_WORKERS = int(environ.get("DOWNLOAD_WORKERS", "3"))          # concurrent .torrent downloads
+    UPLOAD_WORKERS = int(environ.get("UPLOAD_WORKERS", "1"))              # concurrent Telegram uploads; files post in the order they are ready, not homepage order
+    PERSIST_WORKERS = int(environ.get("PERSIST_WORKERS", "1"))            # concurrent database writers
+    PIPELINE_QUEUE_SIZE = int(environ.get("PIPELINE_QUEUE_SIZE", "50"))   # max items waiting per stage
+    RETRY_MAX_ATTEMPTS = int(environ.get("RETRY_MAX_ATTEMPTS", "5"))       # attempts before a failed post is dead-lettered
+    RETRY_BASE_DELAY = int(environ.get("RETRY_BASE_DELAY", "60"))          # seconds before the first retry, doubled each attempt
+    RETRY_MAX_DELAY = int(environ.get("RETRY_MAX_DELAY", "3600"))          # cap on the backoff between attempts
+    RETRY_POLL_INTERVAL = int(environ.get("RETRY_POLL_INTERVAL", "30"))    # seconds between checks for due retries
+    RETRY_BATCH_SIZE = int(environ.get("RETRY_BATCH_SIZE", "10"))          # retries leased per check
+    RETRY_LEASE_SECONDS = int(environ.get("RETRY_LEASE_SECONDS", "900"))   # a lease not completed by then is picked up again
+    COORDINATION = environ.get("COORDINATION", "false").lower() == "true"  # share crawling and posting with other instances
+    INSTANCE_ID = environ.get("INSTANCE_ID", "")                            # this instance's lease owner name; default host-pid
+    CLAIM_LEASE_SECONDS = int(environ.get("CLAIM_LEASE_SECONDS", "300"))   # how long a claim outlives its last renewal before others may take it
+    CLAIM_POLL_INTERVAL = int(environ.get("CLAIM_POLL_INTERVAL", "10"))    # seconds between lease renewals and checks of the shared file queue
+    WRITE_BATCH_SIZE = int(environ.get("WRITE_BATCH_SIZE", "50"))           # buffered results that trigger a flush
+    WRITE_FLUSH_INTERVAL = int(environ.get("WRITE_FLUSH_INTERVAL", "10"))   # max seconds a result waits in the buffer
+    TRACE_LOG_PATH = environ.get("TRACE_LOG_PATH", "cycle_trace.jsonl")     # JSON-lines cycle trace; empty disables
+    TRACE_LOG_MAX_BYTES = int(environ.get("TRACE_LOG_MAX_BYTES", "5000000"))  # rotate the trace file at this size
+    TRACE_LOG_BACKUPS = int(environ.get("TRACE_LOG_BACKUPS", "3"))          # rotated trace files kept
+    BACKFILL_MAX_REQUESTS = int(environ.get("BACKFILL_MAX_REQUESTS", "500"))  # page fetches per backfill run before it pauses
+    BACKFILL_MAX_SECONDS = int(environ.get("BACKFILL_MAX_SECONDS", "3600"))   # wall time per backfill run before it pauses
+    BACKFILL_FRONTIER_SIZE = int(environ.get("BACKFILL_FRONTIER_SIZE", "200"))  # topic pages waiting; next listing fetched below half
+    BACKFILL_RATE = int(environ.get("BACKFILL_RATE", "20"))                   # backfilled files queued per minute
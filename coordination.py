@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import os
+import socket
+from collections import Counter
+
+from config import Config
+from database import db
+
+INTERRUPTED = "Instance stopped during the upload; check the channel before retrying"
+
+
+class Coordinator:
+    """Shares crawling and posting between bot instances through the file_claims collection.
+
+    With COORDINATION on, a crawl queues new files in MongoDB instead of its own
+    pipeline, and every instance leases queued files as it has room for them. Every
+    poll renews the leases of the files still in this instance's pipeline, so only
+    the leases of an instance that died run out and its files are leased again.
+    Just before the upload the lease is turned into an "uploading" mark (and back
+    into a lease if a FloodWait puts the upload off); an instance that lost its
+    lease drops the file. An upload whose instance died is never repeated
+    automatically - it can't be told whether Telegram got it - and is parked as a
+    dead letter for /retry_failed instead. A failed or interrupted
+    file whose retry entry is gone (cleared by the owner) is queued again when a
+    crawl finds it.
+    """
+
+    def __init__(self):
+        self.enabled = Config.COORDINATION
+        self.owner = Config.INSTANCE_ID or f"{socket.gethostname()}-{os.getpid()}"
+        self.progress = Counter()  # leased / posted / lost / interrupted by this instance
+        self.held = {}  # normalized link -> "leased" or "uploading", for claims in this instance's pipeline
+        self._wake = asyncio.Event()
+        self._tasks = set()
+
+    def wake(self):
+        """Lease now instead of waiting for the next interval"""
+        self._wake.set()
+
+    async def enqueue(self, jobs):
+        """Put jobs on the shared queue; returns how many were new to it, None if the queue is unreachable"""
+        queued = await db.enqueue_files(jobs)
+        if queued:
+            self.wake()
+        return queued
+
+    @property
+    def waiting(self):
+        """Files leased here and not being uploaded yet"""
+        return sum(1 for status in self.held.values() if status == "leased")
+
+    async def run(self, submit, room):
+        """Every CLAIM_POLL_INTERVAL, renew held leases, then lease up to room() files and pass them to submit(job)"""
+        while True:
+            try:
+                await self.poll(submit, room)
+            except Exception as e:
+                logging.error(f"Claim poll failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), Config.CLAIM_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def poll(self, submit, room):
+        if self.held:
+            await db.renew_files(self.owner, list(self.held), Config.CLAIM_LEASE_SECONDS)
+
+        for claim in await db.stale_uploads(self.held):
+            if await db.is_file_posted(claim["_id"]):
+                await db.finish_file(claim["_id"], "posted")  # posted, but the claim wasn't closed
+            elif await db.interrupt_file(claim, INTERRUPTED):
+                self.progress["interrupted"] += 1
+                logging.warning(f"Upload of {claim.get('title')} by {claim.get('lease_owner')} was interrupted")
+
+        for _ in range(max(room(), 0)):
+            claim = await db.claim_file(self.owner, Config.CLAIM_LEASE_SECONDS)
+            if claim is None:
+                break
+            self.progress["leased"] += 1
+            self.held.setdefault(claim["_id"], "leased")
+            await submit({
+                "claim": True,
+                "topic_url": claim["topic_url"],
+                "topic_title": claim.get("topic_title", ""),
+                "title": claim["title"],
+                "link": claim["link"],
+                "normalized_link": claim["_id"],
+                "size": claim["size"],
+            })
+
+    async def start_upload(self, job):
+        """Whether this instance may upload job now; False once another instance has it"""
+        ok = await db.start_file_upload(
+            job["normalized_link"], self.owner, Config.CLAIM_LEASE_SECONDS, retry="retry_id" in job
+        )
+        if ok:
+            self.held[job["normalized_link"]] = "uploading"
+        else:
+            self.progress["lost"] += 1
+            self.held.pop(job["normalized_link"], None)
+        return ok
+
+    async def hold(self, job):
+        """Keep the file after an upload was put off (FloodWait): its mark becomes a renewed lease again"""
+        if self.held.get(job["normalized_link"]) != "uploading":
+            return
+        await db.hold_file(job["normalized_link"], self.owner, Config.CLAIM_LEASE_SECONDS)
+        self.held[job["normalized_link"]] = "leased"
+
+    def drop(self, job):
+        """Stop renewing a file this instance won't post; its lease runs out and another instance takes it"""
+        self.held.pop(job["normalized_link"], None)
+
+    def finished(self, job, status):
+        """Close the claim of a posted file, or hand a failed one to the retry queue"""
+        self.held.pop(job["normalized_link"], None)
+        if status == "posted":
+            self.progress["posted"] += 1
+        task = asyncio.create_task(db.finish_file(job["normalized_link"], status))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def stop(self):
+        """Give back files leased but not yet being uploaded"""
+        self.held.clear()
+        released = await db.release_files(self.owner)
+        if released:
+            logging.info(f"Released {released} claimed files to other instances")
+
+    async def report(self):
+        """Figures for /stats"""
+        return {"owner": self.owner, "claims": await db.count_files(), **self.progress}
+
+
+# Global coordinator instance
+coordinator = Coordinator()
@@ -3,15 +3,48 @@ import logging
 from datetime import datetime, timedelta
 import pytz
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 from config import Config
 import os
 
 IST = pytz.timezone('Asia/Kolkata')
 
+# (collection, keys, options) created on connect
+INDEXES = [
+    ("topics", "topic_url", {"unique": True}),
+    ("failed", "file_link", {}),
+    ("failed", "normalized_link", {}),
+    ("failed", [("status", 1), ("next_attempt_at", 1)], {}),
+    ("bot_stats", "date", {}),
+    ("bot_stats", "last_updated", {"expireAfterSeconds": 30 * 24 * 3600}),  # stats kept for 30 days
+    ("posted_files", "posted_at", {}),
+    ("posted_files", "infohash", {"sparse": True}),
+    ("registry", "expires_at", {"expireAfterSeconds": 0}),                 # expire at the stored time
+    ("file_claims", [("status", 1), ("queued_at", 1)], {}),
+    ("file_claims", "finished_at", {"expireAfterSeconds": 7 * 24 * 3600}),  # posted claims kept for 7 days
+    ("registry", [("kind", 1), ("expires_at", -1)], {}),
+]
+
+# (collection, index name) of indexes from earlier versions, dropped on connect
+DROPPED_INDEXES = [
+    ("failed", "failed_at_1"),  # 1-day TTL: retry entries now stay until posted or cleared
+]
+
+
+def _uses_collscan(plan):
+    """Whether an explain() plan tree contains a COLLSCAN stage"""
+    if plan.get("stage") == "COLLSCAN":
+        return True
+    children = plan.get("inputStages", []) + [plan[key] for key in ("inputStage", "queryPlan") if key in plan]
+    return any(_uses_collscan(child) for child in children)
+
+
 class Database:
     def __init__(self):
         self.client = None
         self.db = None
+        self.config = None  # cached bot_config document, kept current by update_bot_config
         
     async def connect(self):
         """Connect to MongoDB"""
@@ -22,6 +55,10 @@ class Database:
             await self.client.admin.command('ping')
             logging.info("✅ Connected to MongoDB successfully")
             
+            # Create indexes (including TTL expiry) and report hot queries still scanning
+            await self.ensure_indexes()
+            await self.check_query_plans()
+
             # Initialize default config if not exists
             await self.initialize_default_config()
             
@@ -29,6 +66,51 @@ class Database:
             logging.error(f"❌ Failed to connect to MongoDB: {e}")
             raise e
     
+    async def ensure_indexes(self):
+        """Create the indexes hot queries rely on; TTL indexes replace manual cleanup passes"""
+        for collection, name in DROPPED_INDEXES:
+            try:
+                if name in await self.db[collection].index_information():
+                    await self.db[collection].drop_index(name)
+                    logging.info(f"Dropped index {name} on {collection}")
+            except Exception as e:
+                logging.error(f"Failed to drop index {name} on {collection}: {e}")
+        for collection, keys, options in INDEXES:
+            try:
+                await self.db[collection].create_index(keys, **options)
+            except Exception as e:
+                logging.error(f"Failed to create index {keys} on {collection}: {e}")
+
+    async def check_query_plans(self):
+        """Explain each hot query and warn about any still using a collection scan"""
+        now = datetime.now(IST)
+        hot_queries = {
+            "topics by topic_url": self.db.topics.find({"topic_url": ""}),
+            "failed by file_link": self.db.failed.find({"file_link": ""}),
+            "failed due for retry": self.db.failed.find(
+                {"status": "pending", "next_attempt_at": {"$lte": now}}
+            ).sort("next_attempt_at", 1),
+            "weekly stats by date": self.db.bot_stats.find({"date": {"$gte": now.strftime("%Y-%m-%d")}}),
+            "posted files by link": self.db.posted_files.find({"_id": {"$in": [""]}}),
+            "posted files since": self.db.posted_files.find({"posted_at": {"$gt": now}}),
+            "posted files by infohash": self.db.posted_files.find({"infohash": ""}),
+            "file claims queued": self.db.file_claims.find({"status": "queued"}).sort("queued_at", 1),
+            "registry load": self.db.registry.find(
+                {"kind": "", "expires_at": {"$gt": now}}
+            ).sort("expires_at", -1),
+        }
+        scanning = []
+        for name, cursor in hot_queries.items():
+            try:
+                plan = await cursor.explain()
+                if _uses_collscan(plan.get("queryPlanner", {}).get("winningPlan", {})):
+                    scanning.append(name)
+            except Exception as e:
+                logging.error(f"Failed to explain query '{name}': {e}")
+        if scanning:
+            logging.warning(f"⚠️ Queries doing a COLLSCAN: {', '.join(scanning)}")
+        return scanning
+
     async def close(self):
         """Close MongoDB connection"""
         if self.client:
@@ -41,11 +123,12 @@ class Database:
         default_config = {
             "_id": "bot_config",
             "base_url": os.environ.get("BASE_URL", "https://www.1tamilmv.blue"),
-            "thumbnail_url": os.environ.get("THUMBNAIL_URL", "https://pbs.twimg.com/profile_images/1672203006232924161/B6aInkS9_400x400.jpg"),
+            "thumbnail_url": Config.THUMBNAIL_URL,
             "caption_template": os.environ.get("CAPTION_TEMPLATE", "**{title}**\n\n**📦 {size}**\n\n**#1TamilMV | #TamilMV | #TMV**\n\n**🚀 Uploaded By ~ @E4Error**"),
             "topic_limit": int(os.environ.get("TOPIC_LIMIT", "0")),
             "last_updated": datetime.now(IST),
-            "updated_by": None
+            "updated_by": None,
+            "version": 0
         }
         
         try:
@@ -55,21 +138,24 @@ class Database:
                 upsert=True
             )
             logging.info("Default configuration initialized")
+            await self.get_bot_config(refresh=True)
         except Exception as e:
             logging.error(f"Failed to initialize default config: {e}")
     
     # Configuration Management
-    async def get_bot_config(self):
-        """Get bot configuration"""
+    async def get_bot_config(self, refresh=False):
+        """Get bot configuration (served from cache; no I/O unless refresh or not yet loaded)"""
+        if self.config is not None and not refresh:
+            return self.config
         try:
-            config = await self.db.config.find_one({"_id": "bot_config"})
-            return config
+            self.config = await self.db.config.find_one({"_id": "bot_config"})
+            return self.config
         except Exception as e:
             logging.error(f"Failed to get bot config: {e}")
-            return None
+            return self.config
     
     async def update_bot_config(self, field, value, user_id=None):
-        """Update specific configuration field"""
+        """Update specific configuration field and refresh the cached config"""
         try:
             update_data = {
                 field: value,
@@ -78,51 +164,156 @@ class Database:
             if user_id:
                 update_data["updated_by"] = user_id
                 
-            await self.db.config.update_one(
+            self.config = await self.db.config.find_one_and_update(
                 {"_id": "bot_config"},
-                {"$set": update_data}
+                {"$set": update_data, "$inc": {"version": 1}},
+                return_document=ReturnDocument.AFTER
             )
             logging.info(f"Updated {field} to {value}")
             return True
         except Exception as e:
+            # Next read goes back to the database
+            self.config = None
             logging.error(f"Failed to update config {field}: {e}")
             return False
-    
+
+    async def watch_config(self, interval=None):
+        """Poll the config version and reload the cache when another process changed it"""
+        interval = Config.CONFIG_POLL_INTERVAL if interval is None else interval
+        if interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                doc = await self.db.config.find_one({"_id": "bot_config"}, {"version": 1})
+                cached_version = self.config.get("version", 0) if self.config else None
+                if doc and doc.get("version", 0) != cached_version:
+                    await self.get_bot_config(refresh=True)
+                    logging.info(f"Reloaded bot config (version {doc.get('version', 0)})")
+            except Exception as e:
+                logging.error(f"Failed to poll config version: {e}")
+
+    # Registry Management (broken URLs, seen topics)
+    async def registry_add(self, kind, key, expires_at):
+        """Add or refresh a registry entry"""
+        try:
+            await self.db.registry.update_one(
+                {"_id": f"{kind}:{key}"},
+                {"$set": {"kind": kind, "key": key, "expires_at": expires_at}},
+                upsert=True
+            )
+        except Exception as e:
+            logging.error(f"Failed to save {kind} registry entry: {e}")
+
+    async def registry_load(self, kind, limit):
+        """Get the newest unexpired registry entries as (key, expires_at), oldest first"""
+        try:
+            cursor = self.db.registry.find(
+                {"kind": kind, "expires_at": {"$gt": datetime.now(IST)}}
+            ).sort("expires_at", -1).limit(limit)
+            docs = await cursor.to_list(length=limit)
+            return [(doc["key"], doc["expires_at"]) for doc in reversed(docs)]
+        except Exception as e:
+            logging.error(f"Failed to load {kind} registry: {e}")
+            return []
+
+    async def load_checkpoint(self, name):
+        """Saved progress of a long-running job (e.g. a backfill), or None"""
+        try:
+            return await self.db.checkpoints.find_one({"_id": name})
+        except Exception as e:
+            logging.error(f"Failed to load {name} checkpoint: {e}")
+            return None
+
+    async def save_checkpoint(self, name, state):
+        """Save the given fields of a job's progress; fields left out keep their saved value"""
+        try:
+            await self.db.checkpoints.update_one(
+                {"_id": name}, {"$set": {**{key: value for key, value in state.items() if key != "_id"}, "updated_at": datetime.now(IST)}}, upsert=True
+            )
+            return True
+        except Exception as e:
+            logging.error(f"Failed to save {name} checkpoint: {e}")
+            return False
+
     # Removed old posted torrents logic: save_last_posted, get_last_posted, and related code.
     # Only topic-centric logic remains.
 
     # Failed Posts Management
-    async def save_failed_post(self, file_link, title, size, error_message):
-        """Save failed post for retry"""
-        try:
-            await self.db.failed.insert_one({
-                "file_link": file_link,
-                "title": title,
-                "size": size,
-                "error_message": error_message,
-                "failed_at": datetime.now(IST),
-                "retry_count": 0
-            })
-            logging.info(f"Saved failed post: {title}")
+    async def claim_failed_post(self, owner, lease_seconds):
+        """Lease the failed post due soonest (or one whose lease ran out); None if nothing is due"""
+        now = datetime.now(IST)
+        try:
+            return await self.db.failed.find_one_and_update(
+                {"$or": [
+                    {"status": "pending", "next_attempt_at": {"$lte": now}},
+                    {"status": "leased", "lease_until": {"$lte": now}},
+                ]},
+                {"$set": {
+                    "status": "leased",
+                    "lease_owner": owner,
+                    "lease_until": now + timedelta(seconds=lease_seconds)
+                }},
+                sort=[("next_attempt_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
         except Exception as e:
-            logging.error(f"Failed to save failed post: {e}")
-    
-    async def get_failed_posts(self):
-        """Get all failed posts"""
+            logging.error(f"Failed to claim failed post: {e}")
+            return None
+
+    async def reschedule_failed_post(self, failed_id, retry_count, error_message, next_attempt_at=None):
+        """Release a leased failed post after another failed attempt; no next_attempt_at dead-letters it"""
         try:
-            cursor = self.db.failed.find({})
-            return await cursor.to_list(length=None)
+            await self.db.failed.update_one(
+                {"_id": failed_id},
+                {"$set": {
+                    "status": "pending" if next_attempt_at else "dead",
+                    "retry_count": retry_count,
+                    "next_attempt_at": next_attempt_at,
+                    "error_message": error_message,
+                    "failed_at": datetime.now(IST),
+                    "lease_owner": None,
+                    "lease_until": None
+                }}
+            )
         except Exception as e:
-            logging.error(f"Failed to get failed posts: {e}")
-            return []
-    
-    async def remove_failed_post(self, file_link):
-        """Remove failed post after successful retry"""
+            logging.error(f"Failed to reschedule failed post: {e}")
+
+    async def requeue_failed_posts(self):
+        """Make every failed post that isn't leased due now, giving dead letters a fresh set of attempts"""
         try:
-            await self.db.failed.delete_one({"file_link": file_link})
+            now = datetime.now(IST)
+            await self.db.failed.update_many({"status": "dead"}, {"$set": {"status": "pending", "retry_count": 0}})
+            result = await self.db.failed.update_many({"status": "pending"}, {"$set": {"next_attempt_at": now}})
+            return result.matched_count
+        except Exception as e:
+            logging.error(f"Failed to requeue failed posts: {e}")
+            return 0
+
+    async def failed_links(self):
+        """Normalized links owned by the retry queue (pending, leased or dead-lettered)"""
+        try:
+            return await self.db.failed.distinct("normalized_link", {"status": {"$in": ["pending", "leased", "dead"]}})
+        except Exception as e:
+            logging.error(f"Failed to load failed links: {e}")
+            return None
+
+    async def count_failed_posts(self):
+        """Number of failed posts per status"""
+        try:
+            cursor = self.db.failed.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}])
+            return {doc["_id"] or "legacy": doc["count"] async for doc in cursor}
+        except Exception as e:
+            logging.error(f"Failed to count failed posts: {e}")
+            return {}
+
+    async def resolve_failed_post(self, normalized_link):
+        """Drop the retry entries of a link that has now been posted"""
+        try:
+            await self.db.failed.delete_many({"normalized_link": normalized_link})
         except Exception as e:
             logging.error(f"Failed to remove failed post: {e}")
-    
+
     async def clear_failed_posts(self):
         """Clear all failed posts"""
         try:
@@ -130,10 +321,203 @@ class Database:
             logging.info("Cleared all failed posts")
         except Exception as e:
             logging.error(f"Failed to clear failed posts: {e}")
+
+    # Shared file queue (coordination mode): one claim per normalized link, leased by one instance at a time
+    async def enqueue_files(self, jobs):
+        """Queue files for whichever instance leases them first; returns how many were queued, None on error.
+
+        Files already queued, leased or posted are left alone. A failed or interrupted
+        file with no retry entry left (cleared by the owner) is queued again, since
+        nothing else would ever post it.
+        """
+        if not jobs:
+            return 0
+        now = datetime.now(IST)
+
+        def fields(job):
+            return {
+                "topic_url": job["topic_url"],
+                "topic_title": job["topic_title"],
+                "title": job["title"],
+                "link": job["link"],
+                "size": job["size"],
+                "queued_at": now,
+            }
+
+        ops = [
+            UpdateOne({"_id": job["normalized_link"]}, {"$setOnInsert": {"status": "queued", **fields(job)}}, upsert=True)
+            for job in jobs
+        ]
+        try:
+            result = await self.db.file_claims.bulk_write(ops, ordered=False)
+            queued = result.upserted_count
+            existing = {job["normalized_link"]: job for i, job in enumerate(jobs) if i not in result.upserted_ids}
+            if not existing:
+                return queued
+            stuck = await self.db.file_claims.distinct(
+                "_id", {"_id": {"$in": list(existing)}, "status": {"$in": ["failed", "interrupted"]}}
+            )
+            if not stuck:
+                return queued
+            retrying = set(await self.db.failed.distinct("normalized_link", {"normalized_link": {"$in": stuck}}))
+            for link in stuck:
+                if link in retrying:
+                    continue  # the retry queue posts it
+                requeued = await self.db.file_claims.update_one(
+                    {"_id": link, "status": {"$in": ["failed", "interrupted"]}},
+                    {"$set": {"status": "queued", "lease_owner": None, "lease_until": None, **fields(existing[link])}}
+                )
+                queued += requeued.modified_count
+            return queued
+        except Exception as e:
+            logging.error(f"Failed to queue {len(jobs)} files: {e}")
+            return None
+
+    async def claim_file(self, owner, lease_seconds):
+        """Lease the oldest queued file, or one whose download lease ran out; None if there is none"""
+        now = datetime.now(IST)
+        try:
+            return await self.db.file_claims.find_one_and_update(
+                {"$or": [
+                    {"status": "queued"},
+                    {"status": "leased", "lease_until": {"$lte": now}},
+                ]},
+                {"$set": {"status": "leased", "lease_owner": owner, "lease_until": now + timedelta(seconds=lease_seconds)}},
+                sort=[("queued_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception as e:
+            logging.error(f"Failed to claim file: {e}")
+            return None
+
+    async def start_file_upload(self, normalized_link, owner, lease_seconds, retry=False):
+        """Mark a file as uploading, only while owner still holds its lease.
+
+        A retry may also take over a file that failed or was interrupted; a link
+        with no claim yet (failed before coordination was enabled) gets one.
+        Returns False if another instance holds the file or it was already posted.
+        """
+        now = datetime.now(IST)
+        allowed = [{"lease_owner": owner, "status": {"$in": ["leased", "uploading"]}}]
+        if retry:
+            allowed.append({"status": {"$in": ["failed", "interrupted"]}})
+        try:
+            await self.db.file_claims.update_one(
+                {"_id": normalized_link, "$or": allowed},
+                {
+                    "$set": {"status": "uploading", "lease_owner": owner, "lease_until": now + timedelta(seconds=lease_seconds)},
+                    "$setOnInsert": {"queued_at": now},
+                },
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False  # the claim exists but doesn't match: someone else has it
+        except Exception as e:
+            logging.error(f"Failed to start upload of {normalized_link}: {e}")
+            return False
+
+    async def renew_files(self, owner, links, lease_seconds):
+        """Extend the leases owner still holds on links (leased or uploading); returns how many were renewed"""
+        try:
+            result = await self.db.file_claims.update_many(
+                {"_id": {"$in": links}, "lease_owner": owner, "status": {"$in": ["leased", "uploading"]}},
+                {"$set": {"lease_until": datetime.now(IST) + timedelta(seconds=lease_seconds)}}
+            )
+            return result.modified_count
+        except Exception as e:
+            logging.error(f"Failed to renew {len(links)} claims: {e}")
+            return 0
+
+    async def hold_file(self, normalized_link, owner, lease_seconds):
+        """Turn owner's upload mark back into a lease, for an upload put off before anything was sent"""
+        try:
+            await self.db.file_claims.update_one(
+                {"_id": normalized_link, "lease_owner": owner, "status": "uploading"},
+                {"$set": {"status": "leased", "lease_until": datetime.now(IST) + timedelta(seconds=lease_seconds)}}
+            )
+        except Exception as e:
+            logging.error(f"Failed to hold claim of {normalized_link}: {e}")
+
+    async def finish_file(self, normalized_link, status):
+        """Release a claim as posted (final) or failed (handed to the retry queue)"""
+        update = {"status": status, "lease_owner": None, "lease_until": None}
+        if status == "posted":
+            update["finished_at"] = datetime.now(IST)
+        try:
+            await self.db.file_claims.update_one({"_id": normalized_link}, {"$set": update})
+        except Exception as e:
+            logging.error(f"Failed to finish claim of {normalized_link}: {e}")
+
+    async def release_files(self, owner):
+        """Put files leased by owner but not yet uploading back in the queue (on shutdown)"""
+        try:
+            result = await self.db.file_claims.update_many(
+                {"lease_owner": owner, "status": "leased"},
+                {"$set": {"status": "queued", "lease_owner": None, "lease_until": None}}
+            )
+            return result.modified_count
+        except Exception as e:
+            logging.error(f"Failed to release claimed files: {e}")
+            return 0
+
+    async def stale_uploads(self, held=(), limit=50):
+        """Files whose uploading instance stopped renewing its lease, other than the held ones"""
+        try:
+            cursor = self.db.file_claims.find(
+                {"_id": {"$nin": list(held)}, "status": "uploading", "lease_until": {"$lte": datetime.now(IST)}}
+            )
+            return await cursor.to_list(length=limit)
+        except Exception as e:
+            logging.error(f"Failed to find stale uploads: {e}")
+            return []
+
+    async def interrupt_file(self, claim, error_message):
+        """Park a file whose upload may or may not have reached Telegram as a dead letter for the owner"""
+        now = datetime.now(IST)
+        try:
+            result = await self.db.file_claims.update_one(
+                {"_id": claim["_id"], "status": "uploading", "lease_until": claim["lease_until"]},
+                {"$set": {"status": "interrupted", "lease_owner": None, "lease_until": None}}
+            )
+            if not result.modified_count:
+                return False  # renewed or finished meanwhile
+            await self.db.failed.update_one(
+                {"normalized_link": claim["_id"]},
+                {"$set": {
+                    "file_link": claim.get("link"),
+                    "title": claim.get("title"),
+                    "size": claim.get("size"),
+                    "topic_url": claim.get("topic_url"),
+                    "topic_title": claim.get("topic_title"),
+                    "error_message": error_message,
+                    "failed_at": now,
+                    "status": "dead",
+                    "next_attempt_at": None,
+                    "lease_owner": None,
+                    "lease_until": None,
+                }, "$setOnInsert": {"retry_count": Config.RETRY_MAX_ATTEMPTS}},
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            logging.error(f"Failed to park interrupted upload {claim['_id']}: {e}")
+            return False
+
+    async def count_files(self):
+        """Number of claims per status"""
+        try:
+            cursor = self.db.file_claims.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}])
+            return {doc["_id"]: doc["count"] async for doc in cursor}
+        except Exception as e:
+            logging.error(f"Failed to count claimed files: {e}")
+            return {}
     
     # Statistics Management
     async def update_daily_stats(self, posts_successful=0, posts_failed=0, total_scraped=0):
         """Update daily statistics"""
+        if not (posts_successful or posts_failed or total_scraped):
+            return
         try:
             today = datetime.now(IST).strftime("%Y-%m-%d")
             
@@ -181,52 +565,79 @@ class Database:
             logging.error(f"Failed to get weekly stats: {e}")
             return []
     
-    async def cleanup_old_data(self):
-        """Clean up old data on bot restart"""
+    async def is_file_posted(self, normalized_link):
+        """Check whether a file has been posted (indexed _id lookup)"""
         try:
-            # Clear old failed posts (older than 1 day)
-            yesterday = datetime.now(IST) - timedelta(days=1)
-            await self.db.failed.delete_many({
-                "failed_at": {"$lt": yesterday}
-            })
-            
-            # Clear old stats (older than 30 days)
-            thirty_days_ago = datetime.now(IST) - timedelta(days=30)
-            await self.db.bot_stats.delete_many({
-                "date": {"$lt": thirty_days_ago.strftime("%Y-%m-%d")}
-            })
-            
-            logging.info("Cleaned up old data")
+            return await self.db.posted_files.count_documents({"_id": normalized_link}, limit=1) > 0
         except Exception as e:
-            logging.error(f"Failed to cleanup old data: {e}")
+            logging.error(f"Failed to check posted file: {e}")
+            return None
 
-    async def add_posted_file_to_topic(self, topic_url, topic_title, file_link, file_title, size, normalized_link=None):
-        """Add a single posted file to a topic document"""
-        from datetime import datetime
+    async def is_infohash_posted(self, infohash):
+        """Check whether a torrent with this infohash was posted under any link"""
         try:
-            file_dict = {
-                "file_link": file_link,
-                "file_title": file_title,
-                "size": size,
-                "posted_at": datetime.now(IST)
-            }
-            
-            # Add normalized link if provided
-            if normalized_link:
-                file_dict["normalized_link"] = normalized_link
-                
-            await self.db.topics.update_one(
-                {"topic_url": topic_url},
-                {
-                    "$set": {"title": topic_title, "last_updated": datetime.now(IST)},
-                    "$addToSet": {"files": file_dict}
-                },
+            return await self.db.posted_files.count_documents({"infohash": infohash}, limit=1) > 0
+        except Exception as e:
+            logging.error(f"Failed to check infohash: {e}")
+            return None
+
+    async def filter_posted(self, normalized_links):
+        """Return the subset of normalized links already posted, or None if the lookup failed"""
+        try:
+            cursor = self.db.posted_files.find({"_id": {"$in": list(normalized_links)}}, {"_id": 1})
+            return {doc["_id"] async for doc in cursor}
+        except Exception as e:
+            logging.error(f"Failed to look up posted files: {e}")
+            return None
+
+    async def posted_links_since(self, since=None):
+        """Normalized links posted after a datetime (all of them if since is None), or None on error"""
+        try:
+            query = {"posted_at": {"$gt": since}} if since else {}
+            cursor = self.db.posted_files.find(query, {"_id": 1})
+            return [doc["_id"] async for doc in cursor]
+        except Exception as e:
+            logging.error(f"Failed to load posted links: {e}")
+            return None
+
+    async def migrate_topic_files(self, normalize):
+        """One-time move of the embedded topics.files arrays into posted_files"""
+        try:
+            if await self.db.config.find_one({"_id": "migrations", "posted_files": True}):
+                return
+            moved = 0
+            async for topic in self.db.topics.find({"files": {"$exists": True}}):
+                inserted = 0
+                for f in topic.get("files", []):
+                    # Older entries have no normalized link stored
+                    normalized_link = f.get("normalized_link") or normalize(f["file_link"])
+                    result = await self.db.posted_files.update_one(
+                        {"_id": normalized_link},
+                        {"$setOnInsert": {
+                            "file_link": f["file_link"],
+                            "file_title": f.get("file_title", ""),
+                            "size": f.get("size", "Unknown"),
+                            "topic_url": topic["topic_url"],
+                            "posted_at": f.get("posted_at", datetime.now(IST))
+                        }},
+                        upsert=True
+                    )
+                    if result.upserted_id is not None:
+                        inserted += 1
+                moved += inserted
+                await self.db.topics.update_one(
+                    {"_id": topic["_id"]},
+                    {"$unset": {"files": ""}, "$set": {"files_count": inserted}}
+                )
+            await self.db.config.update_one(
+                {"_id": "migrations"},
+                {"$set": {"posted_files": True, "posted_files_at": datetime.now(IST)}},
                 upsert=True
             )
-            logging.info(f"Added posted file to topic: {file_title} in {topic_title}")
+            logging.info(f"Migrated {moved} posted files from topics to posted_files")
         except Exception as e:
-            logging.error(f"Failed to add posted file to topic: {e}")
+            logging.error(f"Failed to migrate posted files: {e}")
 
 
 # Global database instance
-db = Database() 
\ No newline at end of file
+db = Database()
@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import struct
+import time
+from datetime import datetime, timedelta
+
+from config import Config
+from database import db, IST
+
+SNAPSHOT_MAGIC = b"TMVBLM1\0"
+SNAPSHOT_HEADER = struct.Struct("<8sQQQd")  # magic, bits, hashes, count, built_at
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on a 128-bit BLAKE2b digest)"""
+
+    def __init__(self, capacity, error_rate, bits=None, hashes=None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits = bits or max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = hashes or max(1, round(self.bits / capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, key):
+        new = False
+        for pos in self._positions(key):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not self.array[byte] & mask:
+                self.array[byte] |= mask
+                new = True
+        if new:
+            self.count += 1
+
+    def __contains__(self, key):
+        return all(self.array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    @property
+    def memory_bytes(self):
+        return len(self.array)
+
+    def estimated_fpr(self):
+        """Expected false-positive rate for the number of keys added so far"""
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+
+class DedupFilter:
+    """Optional Bloom filter over posted normalized links, checked before the posted_files lookup.
+
+    A negative answer is definite, so those links skip the database entirely; a positive
+    answer may be false and is confirmed against posted_files. The filter is snapshotted
+    to disk and caught up from posted_files on start, so restarts don't rebuild it.
+    """
+
+    def __init__(self):
+        # Other instances post files this process never sees, so its "not posted" answers can't be trusted
+        self.enabled = Config.DEDUP_FILTER and not Config.COORDINATION
+        self.path = Config.DEDUP_FILTER_PATH
+        self.bloom = None
+        self._dirty = False
+        self.stats = {"skipped_lookups": 0, "maybe_posted": 0, "false_positives": 0}
+
+    @property
+    def ready(self):
+        return self.enabled and self.bloom is not None
+
+    def _new_bloom(self):
+        return BloomFilter(Config.DEDUP_FILTER_CAPACITY, Config.DEDUP_FILTER_ERROR_RATE)
+
+    def _read_snapshot(self):
+        with open(self.path, "rb") as f:
+            magic, bits, hashes, count, built_at = SNAPSHOT_HEADER.unpack(f.read(SNAPSHOT_HEADER.size))
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError("not a dedup filter snapshot")
+            bloom = BloomFilter(Config.DEDUP_FILTER_CAPACITY, Config.DEDUP_FILTER_ERROR_RATE, bits, hashes)
+            data = f.read()
+        if len(data) != len(bloom.array):
+            raise ValueError("truncated dedup filter snapshot")
+        bloom.array[:] = data
+        bloom.count = count
+        return bloom, built_at
+
+    def _write_snapshot(self, header, data):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    async def load(self):
+        """Warm start from the disk snapshot, then add anything posted since it was taken"""
+        if not self.enabled:
+            return
+        bloom, since = None, None
+        if self.path and os.path.exists(self.path):
+            try:
+                bloom, since = await asyncio.to_thread(self._read_snapshot)
+            except Exception as e:
+                logging.error(f"Failed to read dedup filter snapshot, rebuilding: {e}")
+        if bloom is None:
+            bloom = self._new_bloom()
+        # Overlap the catch-up window a little to cover clock skew and in-flight writes
+        posted_since = datetime.fromtimestamp(since, IST) - timedelta(minutes=5) if since else None
+        links = await db.posted_links_since(posted_since)
+        if links is None:
+            logging.error("Dedup filter disabled: could not load posted files")
+            return
+        for link in links:
+            bloom.add(link)
+        self.bloom = bloom
+        self._dirty = True
+        logging.info(
+            f"Dedup filter ready: {bloom.count} links, {bloom.memory_bytes // 1024} KiB, "
+            f"est. FPR {bloom.estimated_fpr():.4%} ({len(links)} added since snapshot)"
+        )
+        await self.save()
+
+    async def save(self):
+        """Snapshot the filter to disk if it changed"""
+        if not self.ready or not self.path or not self._dirty:
+            return
+        # Every link posted by this process so far has been added, so the snapshot is complete up to now
+        header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, self.bloom.bits, self.bloom.hashes, self.bloom.count, time.time())
+        data = bytes(self.bloom.array)
+        self._dirty = False
+        try:
+            await asyncio.to_thread(self._write_snapshot, header, data)
+        except Exception as e:
+            self._dirty = True
+            logging.error(f"Failed to save dedup filter snapshot: {e}")
+
+    def add(self, normalized_link):
+        if self.ready:
+            self.bloom.add(normalized_link)
+            self._dirty = True
+
+    async def filter_posted(self, normalized_links):
+        """Same contract as db.filter_posted, but only links the filter might contain hit the database"""
+        if not self.ready:
+            return await db.filter_posted(normalized_links)
+        maybe = [link for link in normalized_links if link in self.bloom]
+        self.stats["skipped_lookups"] += len(normalized_links) - len(maybe)
+        self.stats["maybe_posted"] += len(maybe)
+        if not maybe:
+            return set()
+        posted = await db.filter_posted(maybe)
+        if posted is not None:
+            self.stats["false_positives"] += len(maybe) - len(posted)
+        return posted
+
+    def report(self):
+        """Size and accuracy figures for /stats"""
+        if not self.ready:
+            return None
+        # Skipped lookups are true negatives, so FP / (FP + TN) is the measured false-positive rate
+        negatives = self.stats["false_positives"] + self.stats["skipped_lookups"]
+        return {
+            "links": self.bloom.count,
+            "memory_kib": self.bloom.memory_bytes // 1024,
+            "estimated_fpr": self.bloom.estimated_fpr(),
+            "observed_fpr": self.stats["false_positives"] / negatives if negatives else 0.0,
+            **self.stats,
+        }
+
+
+# Global dedup filter instance
+dedup_filter = DedupFilter()
@@ -0,0 +1,109 @@
+import re
+from itertools import chain
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from config import Config
+
+TOPIC_HREF = re.compile(r'/forums/topic/')
+TOPIC_ID = re.compile(r'/forums/topic/(\d+)')
+DO_PARAM = re.compile(r'([?&])do=[^&#]*&?')  # action links such as &do=getNewComment
+CHUNK_SIZE = 64 * 1024
+
+
+def _iter_anchors(html, chunk_size=CHUNK_SIZE):
+    """Yield (attributes, text) for each <a> as the HTML is fed to lxml in chunks.
+
+    Elements are discarded as soon as they close, so memory stays flat no matter
+    how large the page is, and callers can stop consuming to abandon the parse.
+    Elements inside an open <a> are kept until it closes, for the link text.
+    """
+    parser = etree.HTMLPullParser(events=("start", "end"))
+    depth = 0  # <a> elements currently open
+    for start in chain(range(0, len(html), chunk_size), [None]):
+        if start is None:
+            parser.close()  # Flush elements left open at end of input
+        else:
+            parser.feed(html[start:start + chunk_size])
+        for event, elem in parser.read_events():
+            if elem.tag == "a":
+                if event == "start":
+                    depth += 1
+                    continue
+                depth -= 1
+                # Same text as BeautifulSoup's get_text(strip=True)
+                yield dict(elem.attrib), "".join(t.strip() for t in elem.itertext())
+            if event == "start" or depth:
+                continue
+            elem.clear(keep_tail=True)
+            parent = elem.getparent()
+            if parent is None:
+                continue  # Top level, e.g. a comment before <html>
+            while elem.getprevious() is not None:
+                del parent[0]
+
+
+def topic_href(href):
+    """Topic link without its do= action or #fragment, e.g. the listing's "N replies" link"""
+    return DO_PARAM.sub(r"\1", href.split("#", 1)[0]).rstrip("?&")
+
+
+def topic_key(href):
+    """Topic id of a link, so links to the same topic in any form count once"""
+    match = TOPIC_ID.search(href)
+    return match.group(1) if match else topic_href(href)
+
+
+def topic_links(html, limit=None, mode=None):
+    """[href, text] of topics listed on the homepage, deduped by topic in page order, up to limit.
+
+    The text joins every anchor pointing at the same topic (title, reply count), so
+    title edits and new replies show up as changes.
+    """
+    if limit is not None and limit <= 0:
+        return []
+    links = {}
+    if (mode or Config.HTML_PARSER) == "soup":
+        soup = BeautifulSoup(html, "html.parser")
+        anchors = ((a["href"], a.get_text(strip=True)) for a in soup.find_all("a", href=TOPIC_HREF))
+    else:
+        anchors = ((attrs.get("href"), text) for attrs, text in _iter_anchors(html))
+    for href, text in anchors:
+        if not href or not TOPIC_HREF.search(href):
+            continue
+        key = topic_key(href)
+        if key in links:
+            if text:
+                links[key][1].append(text)
+            continue
+        if limit is not None and len(links) >= limit:
+            break  # Stop parsing once we have enough topics
+        links[key] = (topic_href(href), [text] if text else [])
+    return [[href, " | ".join(texts)] for href, texts in links.values()]
+
+
+def next_page(html, mode=None):
+    """href of the page's rel="next" pagination link, or None on the last page"""
+    if (mode or Config.HTML_PARSER) == "soup":
+        tag = BeautifulSoup(html, "html.parser").find("a", rel="next", href=True)
+        return tag["href"] if tag else None
+    for attrs, _ in _iter_anchors(html):
+        if "next" in attrs.get("rel", "").split() and attrs.get("href"):
+            return attrs["href"]
+    return None
+
+
+def torrent_anchors(html, mode=None):
+    """(href, text) of every torrent attachment link on a topic page"""
+    if (mode or Config.HTML_PARSER) == "soup":
+        soup = BeautifulSoup(html, "html.parser")
+        return [
+            (tag.get("href"), tag.get_text(strip=True))
+            for tag in soup.find_all("a", attrs={"data-fileext": "torrent"})
+        ]
+    return [
+        (attrs.get("href"), text)
+        for attrs, text in _iter_anchors(html)
+        if attrs.get("data-fileext") == "torrent"
+    ]
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+import cloudscraper
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import connection as urllib3_connection
+
+from config import Config
+from metrics import stage_seconds
+
+# Connection/DNS counters shared by every pool the session opens
+_counters = {"connections_opened": 0, "dns_lookups": 0, "dns_cache_hits": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(key):
+    with _counters_lock:
+        _counters[key] += 1
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        _count("connections_opened")
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        _count("connections_opened")
+        return super()._new_conn()
+
+
+class DNSCache:
+    """TTL cache in front of getaddrinfo for urllib3 connections"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._original = None
+
+    def resolve(self, host, port):
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                _count("dns_cache_hits")
+                return entry[1]
+        _count("dns_lookups")
+        addresses = [info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)]
+        with self._lock:
+            self._entries[key] = (now + self.ttl, addresses)
+        return addresses
+
+    def forget(self, host, port):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    def create_connection(self, address, *args, **kwargs):
+        """Drop-in for urllib3's create_connection that connects to a cached address"""
+        host, port = address
+        try:
+            addresses = self.resolve(host, port)
+        except OSError:
+            return self._original(address, *args, **kwargs)
+        try:
+            # TLS still uses the original hostname for SNI and verification
+            return self._original((addresses[0], port), *args, **kwargs)
+        except OSError:
+            # Cached address went stale - resolve afresh next time
+            self.forget(host, port)
+            return self._original(address, *args, **kwargs)
+
+    def install(self):
+        if self._original is None:
+            self._original = urllib3_connection.create_connection
+            urllib3_connection.create_connection = self.create_connection
+
+
+class Fetcher:
+    """Shared pooled scraper session; runs blocking requests off the event loop with bounded concurrency"""
+
+    def __init__(self, concurrency=None, host_delay=None):
+        self.concurrency = concurrency or Config.CRAWL_CONCURRENCY
+        self.host_delay = Config.CRAWL_HOST_DELAY if host_delay is None else host_delay
+        self.requests = 0
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._semaphore = None
+        self._host_locks = {}
+        self._host_last = {}
+        self._dns_cache = DNSCache(Config.DNS_CACHE_TTL) if Config.DNS_CACHE_TTL > 0 else None
+
+    @property
+    def session(self):
+        """The long-lived cloudscraper session (keeps cookies, Cloudflare clearance and connections)"""
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._create_session()
+            return self._session
+
+    def _create_session(self):
+        scraper = cloudscraper.create_scraper()
+        pool_kwargs = {
+            "pool_connections": Config.HTTP_POOL_CONNECTIONS,
+            "pool_maxsize": Config.HTTP_POOL_MAXSIZE,
+        }
+        # Re-mount cloudscraper's TLS adapter with our pool sizes
+        https_adapter = cloudscraper.CipherSuiteAdapter(
+            cipherSuite=scraper.cipherSuite,
+            ecdhCurve=scraper.ecdhCurve,
+            server_hostname=scraper.server_hostname,
+            source_address=scraper.source_address,
+            ssl_context=scraper.ssl_context,
+            **pool_kwargs
+        )
+        http_adapter = HTTPAdapter(**pool_kwargs)
+        for adapter in (https_adapter, http_adapter):
+            adapter.poolmanager.pool_classes_by_scheme = {
+                "http": _CountingHTTPConnectionPool,
+                "https": _CountingHTTPSConnectionPool,
+            }
+        scraper.mount("https://", https_adapter)
+        scraper.mount("http://", http_adapter)
+
+        if self._dns_cache:
+            self._dns_cache.install()
+        logging.info("Created shared scraper session")
+        return scraper
+
+    def stats(self):
+        """Connection reuse counters since startup"""
+        with _counters_lock:
+            counters = dict(_counters)
+        counters["requests"] = self.requests
+        counters["connections_reused"] = max(self.requests - counters["connections_opened"], 0)
+        return counters
+
+    def _get_semaphore(self):
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def _wait_for_host(self, url):
+        """Space out request starts to the same host by host_delay seconds"""
+        if self.host_delay <= 0:
+            return
+        host = urlparse(url).netloc
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self._host_last.get(host, 0) + self.host_delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._host_last[host] = time.monotonic()
+
+    async def get(self, url, timeout=10, stage=None, **kwargs):
+        """Fetch a URL in a worker thread without blocking the event loop.
+
+        With stage, the request time (excluding waits for a free slot) is recorded
+        under that stage in tmv_stage_duration_seconds.
+        """
+        session = self.session
+        async with self._get_semaphore():
+            await self._wait_for_host(url)
+            self.requests += 1
+            if stage is None:
+                return await asyncio.to_thread(session.get, url, timeout=timeout, **kwargs)
+            with stage_seconds.time(stage):
+                return await asyncio.to_thread(session.get, url, timeout=timeout, **kwargs)
+
+    async def get_many(self, urls, timeout=10, headers_for=None, stage=None):
+        """Fetch URLs concurrently, returning responses (or exceptions) in input order"""
+        return await asyncio.gather(
+            *(
+                self.get(url, timeout=timeout, stage=stage, headers=headers_for(url) if headers_for else None)
+                for url in urls
+            ),
+            return_exceptions=True
+        )
+
+
+# Global fetcher instance
+fetcher = Fetcher()
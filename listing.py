@@ -0,0 +1,53 @@
+import logging
+
+from config import Config
+
+
+class ListingSnapshot:
+    """Previous homepage listing, used to fetch only topics that are new or show a change signal"""
+
+    def __init__(self, full_sweep_every=None):
+        self.full_sweep_every = full_sweep_every or Config.FULL_SWEEP_EVERY
+        self.previous = {}  # topic key -> (position, marker)
+        self.cycles_since_sweep = 0
+
+    def changed(self, entries):
+        """Keys from [(key, marker), ...] (homepage order) that need fetching this cycle.
+
+        A topic needs fetching when it is new to the listing, its marker text changed
+        (title edits, reply counts) or it was bumped above topics that used to be ahead
+        of it. Every full_sweep_every cycles everything is fetched as a safety net.
+        """
+        if not self.previous or self.cycles_since_sweep + 1 >= self.full_sweep_every:
+            self.cycles_since_sweep = 0
+            logging.info(f"Homepage diff: full sweep of {len(entries)} topics")
+            return {key for key, _ in entries}
+        self.cycles_since_sweep += 1
+
+        # Rank of each surviving topic among the others, before and now
+        common = [key for key, _ in entries if key in self.previous]
+        before = {key: rank for rank, key in enumerate(sorted(common, key=lambda k: self.previous[k][0]))}
+
+        changed = set()
+        rank = 0
+        for key, marker in entries:
+            if key not in self.previous:
+                changed.add(key)
+                continue
+            if self.previous[key][1] != marker or rank < before[key]:
+                changed.add(key)
+            rank += 1
+        logging.info(f"Homepage diff: {len(changed)} of {len(entries)} topics new or changed")
+        return changed
+
+    def update(self, entries, failed=()):
+        """Record this cycle's listing; failed keys are left out so they are fetched again"""
+        self.previous = {
+            key: (position, marker)
+            for position, (key, marker) in enumerate(entries)
+            if key not in failed
+        }
+
+
+# Global listing snapshot instance
+listing_snapshot = ListingSnapshot()
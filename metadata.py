@@ -0,0 +1,150 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+CACHE_SIZE = 8192  # distinct raw titles kept; a busy topic has a few hundred
+
+# Leading domain such as "www.1tamilmv.blue - ", "1tamilmv.se – " or "https://www.tamilmv.boo - "
+DOMAIN_PREFIX = re.compile(r'^\s*(?:https?://)?(?:www\.)?(?:[a-z0-9-]+\.)+[a-z]{2,}\s*[-–—]\s*', re.IGNORECASE)
+TORRENT_SUFFIX = re.compile(r'\.torrent\s*$', re.IGNORECASE)
+SPACES = re.compile(r'\s{2,}')
+
+LANGUAGES = {
+    "tamil": "Tamil", "tam": "Tamil",
+    "telugu": "Telugu", "tel": "Telugu",
+    "hindi": "Hindi", "hin": "Hindi",
+    "malayalam": "Malayalam", "mal": "Malayalam",
+    "kannada": "Kannada", "kan": "Kannada",
+    "english": "English", "eng": "English",
+    "bengali": "Bengali", "marathi": "Marathi", "punjabi": "Punjabi", "gujarati": "Gujarati",
+    "korean": "Korean", "kor": "Korean", "japanese": "Japanese", "jap": "Japanese",
+    "chinese": "Chinese", "spanish": "Spanish", "french": "French",
+}
+CODECS = {"x265": "HEVC", "h265": "HEVC", "h.265": "HEVC", "hevc": "HEVC",
+          "x264": "AVC", "h264": "AVC", "h.264": "AVC", "avc": "AVC", "av1": "AV1", "vp9": "VP9"}
+SIZE_UNITS = {"kb": 1024, "mb": 1024 ** 2, "gb": 1024 ** 3}
+
+# Every field in one alternation, so a title is scanned once. Sizes skip bitrates
+# such as 128kbps/mbps; a bare NNNp resolution wins over a 4K/UHD tag.
+TOKENS = re.compile(
+    r"""
+    (?P<size>\b(?P<size_value>\d+(?:\.\d+)?)\s*(?P<size_unit>GB|MB|KB)\b)
+    | \bS(?P<season>\d{1,2})\s*-?\s*(?:EP?\s*\(?(?P<episode>\d{1,3})(?:\s*[-–]\s*(?:EP?)?(?P<episode_end>\d{1,3}))?\)?)?(?=\W|$)
+    | \bSeason\s*(?P<season_word>\d{1,2})\b
+    | \b(?P<resolution>\d{3,4})p\b
+    | \b(?P<uhd>4K|UHD)\b
+    | (?P<codec>\b(?:x26[45]|h\.?26[45]|HEVC|AVC|AV1|VP9)\b)
+    | (?P<source>\b(?:WEB-?DL|WEB-?Rip|HDRip|BluRay|BDRip|BRRip|HDTV|DVDRip|PreDVD|HDTS|HDCAM|CAMRip)\b)
+    | (?P<language>\b(?:""" + "|".join(sorted(LANGUAGES, key=len, reverse=True)) + r""")\b)
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+PLACEHOLDER = re.compile(r"\{(\w+)\}")
+PLACEHOLDERS = ("title", "size", "quality", "resolution", "source", "codec", "languages", "season", "episode")
+
+
+class TitleInfo(NamedTuple):
+    """Fields of one attachment title; immutable because parse_title results are shared"""
+
+    title: str                      # display title: no domain prefix or .torrent suffix
+    size: str = "Unknown"           # size as written, e.g. "1.4GB"
+    size_bytes: Optional[int] = None
+    resolution: Optional[str] = None  # e.g. "1080p"; a lone 4K/UHD tag counts as 2160p
+    source: Optional[str] = None      # e.g. "WEB-DL", "HDRip"
+    codec: Optional[str] = None       # "AVC", "HEVC", "AV1" or "VP9"
+    languages: Tuple[str, ...] = ()
+    season: Optional[int] = None
+    episode: Optional[int] = None
+    episode_end: Optional[int] = None  # last episode of a pack such as "S01 EP (01-08)"
+
+    @property
+    def quality(self):
+        return " ".join(part for part in (self.resolution, self.source) if part) or None
+
+    def placeholders(self):
+        """Caption template values; fields the title doesn't have are "Unknown" """
+        if self.episode is None:
+            episode = None
+        elif self.episode_end is None:
+            episode = f"E{self.episode:02d}"
+        else:
+            episode = f"E{self.episode:02d}-E{self.episode_end:02d}"
+        values = {
+            "title": self.title,
+            "size": self.size,
+            "quality": self.quality,
+            "resolution": self.resolution,
+            "source": self.source,
+            "codec": self.codec,
+            "languages": " + ".join(self.languages) or None,
+            "season": f"S{self.season:02d}" if self.season is not None else None,
+            "episode": episode,
+        }
+        return {name: value or "Unknown" for name, value in values.items()}
+
+
+def clean(raw_title):
+    """Strip a leading domain, a trailing .torrent and repeated spaces"""
+    title = DOMAIN_PREFIX.sub("", (raw_title or "").strip(), count=1)
+    title = TORRENT_SUFFIX.sub("", title, count=1)
+    return SPACES.sub(" ", title).strip()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_title(raw_title):
+    """Structured fields of a raw attachment title, memoized by the raw title"""
+    title = clean(raw_title)
+    fields = {}
+    languages = []
+    uhd = False
+    for match in TOKENS.finditer(title):
+        group = match.lastgroup
+        if group in ("size", "size_unit") and "size" not in fields:
+            fields["size"] = match.group("size")
+            unit = SIZE_UNITS[match.group("size_unit").lower()]
+            fields["size_bytes"] = int(float(match.group("size_value")) * unit)
+        elif match.group("season") is not None or match.group("season_word") is not None:
+            if "season" not in fields:
+                fields["season"] = int(match.group("season") or match.group("season_word"))
+                if match.group("episode") is not None:
+                    fields["episode"] = int(match.group("episode"))
+                if match.group("episode_end") is not None:
+                    fields["episode_end"] = int(match.group("episode_end"))
+        elif match.group("resolution") is not None:
+            fields.setdefault("resolution", match.group("resolution") + "p")
+        elif match.group("uhd") is not None:
+            uhd = True
+        elif group == "codec":
+            fields.setdefault("codec", CODECS[match.group("codec").lower()])
+        elif group == "source":
+            fields.setdefault("source", match.group("source"))
+        elif group == "language":
+            language = LANGUAGES[match.group("language").lower()]
+            if language not in languages:
+                languages.append(language)
+    if uhd and "resolution" not in fields:
+        fields["resolution"] = "2160p"
+    return TitleInfo(title, languages=tuple(languages), **fields)
+
+
+@lru_cache(maxsize=16)
+def _compile(template):
+    """str.format pattern for a caption template: known placeholders kept, every other brace escaped"""
+    pattern = []
+    for i, part in enumerate(PLACEHOLDER.split(template)):
+        if i % 2 and part in PLACEHOLDERS:
+            pattern.append("{" + part + "}")
+        else:
+            text = part if i % 2 == 0 else "{" + part + "}"
+            pattern.append(text.replace("{", "{{").replace("}", "}}"))
+    return "".join(pattern)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _values(info):
+    return info.placeholders()
+
+
+def render(template, info):
+    """Fill {name} placeholders from a TitleInfo; unknown names are left as they are"""
+    return _compile(template).format_map(_values(info))
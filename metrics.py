@@ -0,0 +1,155 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers a parse of a small page up to a slow Telegram upload
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(label, value, extra=None):
+    pairs = ([(label, value)] if label else []) + (extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(val)}"' for name, val in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """One metric family with at most one label.
+
+    Values are either recorded as they happen or, with func, read when scraped:
+    func returns a number, or a {label value: number} dict for labelled metrics.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, registry, name, help, label=None, func=None):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.label = label
+        self.func = func
+        # label value (None when unlabelled) -> number; unlabelled metrics start at 0
+        self.values = {None: 0} if label is None and func is None else {}
+
+    def _samples(self):
+        if self.func is None:
+            return list(self.values.items())
+        value = self.func()
+        return list(value.items()) if isinstance(value, dict) else [(None, value)]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for label_value, value in self._samples():
+            lines.append(f"{self.name}{_labels(self.label, label_value)} {_number(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, label_value=None):
+        with self.registry.lock:
+            self.values[label_value] = self.values.get(label_value, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, label_value=None):
+        with self.registry.lock:
+            self.values[label_value] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, help, label=None, buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, help, label)
+        self.values = {}
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, label_value=None):
+        with self.registry.lock:
+            series = self.values.get(label_value)
+            if series is None:
+                series = self.values[label_value] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, label_value=None):
+        """Observe the duration of a with block (also usable around awaits)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, label_value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for label_value, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["counts"]):
+                cumulative += count
+                le = [("le", _number(bound))]
+                lines.append(f"{self.name}_bucket{_labels(self.label, label_value, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label, label_value)} {_number(series['sum'])}")
+            lines.append(f"{self.name}_count{_labels(self.label, label_value)} {series['count']}")
+        return lines
+
+
+class Registry:
+    """Metrics exposed in the Prometheus text format; updated from the bot loop, scraped from Flask"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def _add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, label=None, func=None):
+        return self._add(Counter(self, name, help, label, func))
+
+    def gauge(self, name, help, label=None, func=None):
+        return self._add(Gauge(self, name, help, label, func))
+
+    def histogram(self, name, help, label=None, buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(self, name, help, label, buckets))
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for metric in list(self.metrics.values()):
+                try:
+                    lines.extend(metric.render())
+                except Exception as e:
+                    lines.append(f"# {metric.name} unavailable: {_escape(e)}")
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics registry and the metrics recorded directly by the crawl and pipeline
+metrics = Registry()
+stage_seconds = metrics.histogram(
+    "tmv_stage_duration_seconds",
+    "Time per operation of each stage (homepage_fetch, topic_fetch, parse, torrent_download, telegram_upload, mongo_write)",
+    label="stage",
+)
+posts_total = metrics.counter("tmv_posts_total", "Files handled by the pipeline, by result", label="result")
+duplicates_total = metrics.counter("tmv_duplicates_skipped_total", "Files skipped as already posted, by check", label="check")
+not_found_total = metrics.counter("tmv_topic_not_found_total", "Topic pages that returned 404")
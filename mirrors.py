@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+from config import Config
+from database import db
+from fetcher import fetcher
+from cache import validator_cache
+
+LATENCY_SMOOTHING = 0.5  # weight of the latest probe in a mirror's latency
+
+
+class MirrorPool:
+    """Ranks the forum's mirrors by probed latency so the crawl always starts at the fastest healthy one.
+
+    Candidates are the base URL from /settings followed by Config.MIRRORS. Every
+    probe interval each candidate's homepage is fetched in the background; a
+    mirror is healthy while its last probe or crawl fetch answered 200/304.
+    Mirrors that were never probed count as healthy, ranked after measured ones.
+    """
+
+    def __init__(self, mirrors=None, probe_interval=None):
+        self.mirrors = [m.rstrip("/") for m in (Config.MIRRORS if mirrors is None else mirrors) if m]
+        self.probe_interval = probe_interval or Config.MIRROR_PROBE_INTERVAL
+        self.state = {}   # mirror -> {"latency", "healthy", "checked_at", "error"}
+        self.base_url = None  # configured base URL of the last crawl
+        self.active = None
+        self.switches = 0
+
+    def candidates(self, base_url):
+        ordered = [base_url.rstrip("/")] if base_url else []
+        ordered += [m for m in self.mirrors if m not in ordered]
+        return ordered
+
+    def _entry(self, mirror):
+        return self.state.setdefault(mirror, {"latency": None, "healthy": True, "checked_at": None, "error": None})
+
+    def ranked(self, base_url):
+        """Healthy candidates, fastest first; the configured base URL alone if none are healthy"""
+        candidates = self.candidates(base_url)
+        healthy = [m for m in candidates if self._entry(m)["healthy"]]
+        if not healthy:
+            return candidates[:1]
+        return sorted(healthy, key=lambda m: (self.state[m]["latency"] is None, self.state[m]["latency"] or 0))
+
+    def succeeded(self, mirror, seconds):
+        entry = self._entry(mirror)
+        if entry["latency"] is None:
+            entry["latency"] = seconds
+        else:
+            entry["latency"] = LATENCY_SMOOTHING * seconds + (1 - LATENCY_SMOOTHING) * entry["latency"]
+        entry.update(healthy=True, checked_at=time.time(), error=None)
+
+    def failed(self, mirror, error):
+        entry = self._entry(mirror)
+        if entry["healthy"]:
+            logging.warning(f"Mirror {mirror} marked down: {error}")
+        entry.update(healthy=False, checked_at=time.time(), error=str(error))
+
+    def use(self, mirror):
+        """Record the mirror a crawl actually used"""
+        if mirror != self.active:
+            if self.active is not None:
+                self.switches += 1
+                logging.info(f"Crawling from {mirror} (was {self.active})")
+            self.active = mirror
+
+    async def fetch_homepage(self, base_url, **kwargs):
+        """Fetch the topic listing from the best mirror, failing over to the next one on error.
+
+        Returns (mirror, response); raises the last error if every healthy mirror failed.
+        """
+        self.base_url = base_url
+        error = None
+        for mirror in self.ranked(base_url):
+            start = time.perf_counter()
+            try:
+                resp = await fetcher.get(mirror, timeout=10, headers=validator_cache.headers(mirror), **kwargs)
+                if resp.status_code not in (200, 304):
+                    raise RuntimeError(f"HTTP {resp.status_code}")
+            except Exception as e:
+                self.failed(mirror, e)
+                error = e
+                continue
+            self.succeeded(mirror, self._elapsed(resp, start))
+            self.use(mirror)
+            return mirror, resp
+        raise error
+
+    def rebase(self, url, mirror=None):
+        """Point a forum link at mirror (default: the active one) if it is relative or on a candidate mirror"""
+        mirror = mirror or self.active
+        parts = urlsplit(url)
+        if not mirror or (parts.netloc and parts.netloc not in {urlsplit(m).netloc for m in self.candidates(self.base_url)}):
+            return url
+        return urlunsplit(urlsplit(mirror)[:2] + parts[2:])
+
+    @staticmethod
+    def _elapsed(resp, start):
+        # Time to the response headers when requests recorded it, else wall time including waits
+        elapsed = getattr(resp, "elapsed", None)
+        return elapsed.total_seconds() if elapsed is not None else time.perf_counter() - start
+
+    async def probe(self, base_url):
+        """Fetch every candidate's homepage concurrently and update latency and health"""
+        candidates = self.candidates(base_url)
+        start = time.perf_counter()
+        responses = await fetcher.get_many(candidates, timeout=10, headers_for=validator_cache.headers, stage="mirror_probe")
+        for mirror, resp in zip(candidates, responses):
+            if isinstance(resp, Exception):
+                self.failed(mirror, resp)
+            elif resp.status_code not in (200, 304):
+                self.failed(mirror, f"HTTP {resp.status_code}")
+            else:
+                self.succeeded(mirror, self._elapsed(resp, start))
+
+    async def run(self):
+        """Probe the candidates every probe interval while there is more than one"""
+        while True:
+            try:
+                config = await db.get_bot_config()
+                base_url = config.get("base_url") if config else None
+                if len(self.candidates(base_url)) > 1:
+                    await self.probe(base_url)
+            except Exception as e:
+                logging.error(f"Mirror probe failed: {e}")
+            await asyncio.sleep(self.probe_interval)
+
+    def report(self, base_url):
+        """Per-mirror figures for /stats, in ranking order"""
+        ranked = self.ranked(base_url)
+        rest = [m for m in self.candidates(base_url) if m not in ranked]
+        return [dict(self._entry(m), mirror=m) for m in ranked + rest]
+
+
+# Global mirror pool instance
+mirror_pool = MirrorPool()
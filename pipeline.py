@@ -0,0 +1,83 @@
+import asyncio
+import logging
+
+
+class Stage:
+    """One pipeline step: a bounded input queue drained by a fixed number of workers"""
+
+    def __init__(self, name, handler, workers, maxsize):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.busy = 0
+        self.processed = 0
+
+
+class Pipeline:
+    """Stages linked by bounded asyncio queues, so a slow stage applies backpressure upstream.
+
+    A handler returns the item to pass to the next stage, or None to drop it
+    (e.g. after recording a failure).
+    """
+
+    def __init__(self):
+        self.stages = []
+        self._tasks = []
+        self._requeued = set()
+
+    def add_stage(self, name, handler, workers=1, maxsize=50):
+        self.stages.append(Stage(name, handler, workers, maxsize))
+        return self
+
+    def start(self):
+        for index, stage in enumerate(self.stages):
+            next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            for _ in range(stage.workers):
+                self._tasks.append(asyncio.create_task(self._worker(stage, next_stage)))
+
+    async def stop(self):
+        tasks = self._tasks + list(self._requeued)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, stage, next_stage):
+        while True:
+            item = await stage.queue.get()
+            stage.busy += 1
+            try:
+                result = await stage.handler(item)
+                if result is not None and next_stage:
+                    await next_stage.queue.put(result)
+            except Exception as e:
+                logging.error(f"Unhandled error in {stage.name} stage: {e}")
+            finally:
+                stage.busy -= 1
+                stage.processed += 1
+                stage.queue.task_done()
+
+    async def put(self, item):
+        """Feed the first stage, waiting while its queue is full"""
+        await self.stages[0].queue.put(item)
+
+    def requeue(self, name, item):
+        """Put an item back on a stage's queue without blocking the calling worker"""
+        stage = next(stage for stage in self.stages if stage.name == name)
+        task = asyncio.create_task(stage.queue.put(item))
+        self._requeued.add(task)
+        task.add_done_callback(self._requeued.discard)
+
+    def depths(self):
+        """Per-stage queue depth and activity"""
+        return {
+            stage.name: {
+                "queued": stage.queue.qsize(),
+                "capacity": stage.queue.maxsize,
+                "busy": stage.busy,
+                "workers": stage.workers,
+                "processed": stage.processed,
+            }
+            for stage in self.stages
+        }
@@ -0,0 +1,124 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+TOP = 12                 # functions listed per table
+
+_IDLE_FILES = ("threading.py", "queue.py")
+
+
+def _where(code):
+    """Function label with the last two path components of its file"""
+    path = os.path.join(*os.path.normpath(code.co_filename).split(os.sep)[-2:])
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class CycleProfiler:
+    """Wall-clock sampling profiler armed for the next N crawl cycles.
+
+    Samples the event loop thread and asyncio's worker threads (where HTTP requests,
+    parsing and MongoDB calls run), so time spent waiting on Cloudflare shows up next
+    to time spent parsing. cProfile would only see the event loop thread.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.remaining = 0
+        self.chat_id = None
+        self._reset()
+
+    def _reset(self):
+        self.cycles = 0
+        self.samples = 0
+        self.seconds = 0.0
+        self.self_counts = Counter()
+        self.total_counts = Counter()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def armed(self):
+        return self.remaining > 0
+
+    def request(self, cycles, chat_id):
+        """Profile the next cycles crawl cycles and report to chat_id; False while a profile is still running"""
+        if self.armed:
+            return False  # the sampler thread of a running cycle still writes to the counters
+        self._reset()
+        self.remaining = cycles
+        self.chat_id = chat_id
+        return True
+
+    def start_cycle(self):
+        if not self.armed:
+            return
+        self._loop_thread = threading.get_ident()
+        self._started = time.perf_counter()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cycle-profiler", daemon=True)
+        self._thread.start()
+
+    def end_cycle(self):
+        """Stop sampling; returns (chat_id, report) after the last profiled cycle"""
+        if self._thread is None:
+            return None
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.seconds += time.perf_counter() - self._started
+        self.cycles += 1
+        self.remaining -= 1
+        if self.remaining > 0:
+            return None
+        return self.chat_id, self.report()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident != self._loop_thread and not names.get(ident, "").startswith("asyncio_"):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            if ident != self._loop_thread and self._idle(stack):
+                continue
+            self.samples += 1
+            self.self_counts[stack[0]] += 1
+            for code in set(stack):
+                self.total_counts[code] += 1
+
+    @staticmethod
+    def _idle(stack):
+        """A worker thread waiting for work: only queue/lock waits above the pool's _worker loop"""
+        for code in stack:
+            if os.path.basename(code.co_filename) in _IDLE_FILES:
+                continue
+            return code.co_name == "_worker"
+        return True
+
+    def report(self):
+        def table(counts):
+            return "\n".join(
+                f"`{count * 100 / self.samples:5.1f}%` {_where(code)}"
+                for code, count in counts.most_common(TOP)
+            )
+
+        if not self.samples:
+            return f"🔬 Profiled {self.cycles} cycles ({self.seconds:.1f}s) but took no samples"
+        return (
+            f"🔬 **Profile of {self.cycles} cycles** ({self.seconds:.1f}s, {self.samples} samples)\n\n"
+            f"**Self time** (running in the function itself):\n{table(self.self_counts)}\n\n"
+            f"**Total time** (function or anything it called):\n{table(self.total_counts)}"
+        )
+
+
+# Global cycle profiler instance
+cycle_profiler = CycleProfiler()
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+
+from pyrogram.errors import FloodWait
+
+# Telegram's documented bot limits: ~30 messages/second overall, 1 message/second
+# in a private chat and 20 messages/minute in a group or channel.
+GLOBAL_RATE = 30.0
+PRIVATE_CHAT_RATE = 1.0
+GROUP_CHAT_RATE = 20 / 60
+
+
+class TokenBucket:
+    """Token bucket whose rate backs off on FloodWait and creeps back up on success"""
+
+    def __init__(self, rate, burst=1):
+        self.max_rate = rate
+        self.min_rate = rate / 8
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for seconds and halve the rate"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def succeeded(self):
+        """Additive increase back towards the documented rate"""
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    @property
+    def paused_for(self):
+        return max(0.0, self.paused_until - time.monotonic())
+
+
+class SendLimiter:
+    """Per-chat token buckets plus a global bucket; FloodWait pauses only the affected chat"""
+
+    def __init__(self):
+        self.global_bucket = TokenBucket(GLOBAL_RATE, burst=int(GLOBAL_RATE))
+        self.chats = {}
+        self.flood_waits = 0
+
+    def bucket(self, chat_id):
+        if chat_id not in self.chats:
+            # Negative IDs are groups and channels
+            rate = GROUP_CHAT_RATE if int(chat_id) < 0 else PRIVATE_CHAT_RATE
+            self.chats[chat_id] = TokenBucket(rate)
+        return self.chats[chat_id]
+
+    async def wait(self, chat_id):
+        """Wait for permission to send one message to chat_id"""
+        await self.bucket(chat_id).acquire()
+        await self.global_bucket.acquire()
+
+    def succeeded(self, chat_id):
+        self.bucket(chat_id).succeeded()
+
+    def flood_wait(self, chat_id, seconds):
+        """Pause chat_id for the retry_after Telegram asked for"""
+        self.flood_waits += 1
+        self.bucket(chat_id).pause(seconds)
+        logging.warning(f"FloodWait for {chat_id}: pausing {seconds}s")
+
+    async def call(self, chat_id, func, *args, retries=3, **kwargs):
+        """Rate-limited call that waits out FloodWait and retries"""
+        for attempt in range(retries + 1):
+            await self.wait(chat_id)
+            try:
+                result = await func(chat_id, *args, **kwargs)
+                self.succeeded(chat_id)
+                return result
+            except FloodWait as e:
+                self.flood_wait(chat_id, e.value)
+                if attempt == retries:
+                    raise
+
+    def report(self):
+        """Current rate (messages/minute) and remaining pause per chat"""
+        return {
+            chat_id: {"per_minute": bucket.rate * 60, "paused_for": bucket.paused_for}
+            for chat_id, bucket in self.chats.items()
+        }
+
+
+# Global send limiter instance
+send_limiter = SendLimiter()
@@ -0,0 +1,57 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from config import Config
+from database import db, IST
+
+
+class Registry:
+    """Bounded set with TTL expiry and LRU eviction, persisted to MongoDB so it survives restarts"""
+
+    def __init__(self, kind, ttl_days, max_entries=None):
+        self.kind = kind
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries or Config.REGISTRY_MAX_ENTRIES
+        self._entries = OrderedDict()  # key -> expiry (epoch seconds)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        expires = self._entries.get(key)
+        if expires is None:
+            return False
+        if expires <= time.time():
+            del self._entries[key]
+            return False
+        self._entries.move_to_end(key)
+        return True
+
+    def _remember(self, key, expires):
+        self._entries[key] = expires
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def add(self, key):
+        """Remember a key for ttl_days, in memory and in the database"""
+        expires = time.time() + self.ttl
+        self._remember(key, expires)
+        await db.registry_add(self.kind, key, datetime.fromtimestamp(expires, IST))
+
+    async def load(self):
+        """Load the most recently added unexpired keys from the database"""
+        self._entries.clear()
+        now = time.time()
+        for key, expires_at in await db.registry_load(self.kind, self.max_entries):
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)  # pymongo returns naive UTC
+            expires = expires_at.timestamp()
+            if expires > now:
+                self._remember(key, expires)
+
+
+# Registries for 404 topic URLs and topics already processed
+broken_urls = Registry("broken", Config.BROKEN_URL_TTL_DAYS)
+seen_topics = Registry("seen", Config.SEEN_TOPIC_TTL_DAYS)
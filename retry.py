@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import random
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+from config import Config
+from database import db, IST
+from writebuffer import write_buffer
+
+
+class RetryEngine:
+    """Background worker that leases due failed posts and sends them back through the pipeline.
+
+    Each failed link has one entry in the failed collection. A retry that fails again
+    is rescheduled with exponential backoff and jitter, and dead-lettered after
+    RETRY_MAX_ATTEMPTS. Leases expire, so entries held by a crashed process are
+    picked up again; an entry whose link turns out to be posted already is dropped.
+    Links owned by the queue are left out of the crawl so they're only retried here.
+    """
+
+    def __init__(self):
+        self.owner = uuid.uuid4().hex
+        self.owned = set()   # normalized links with a pending, leased or dead entry
+        self.progress = Counter()  # succeeded / rescheduled / dead since start
+        self._wake = asyncio.Event()
+        self._tasks = set()
+
+    @staticmethod
+    def next_attempt(retry_count):
+        """When attempt retry_count + 1 is due; jitter spreads out posts that failed together"""
+        delay = min(Config.RETRY_MAX_DELAY, Config.RETRY_BASE_DELAY * 2 ** retry_count)
+        return datetime.now(IST) + timedelta(seconds=delay * random.uniform(0.5, 1.5))
+
+    async def load(self):
+        links = await db.failed_links()
+        if links is not None:
+            # Failures still waiting in the write buffer are owned too
+            self.owned = set(links) | {doc["normalized_link"] for doc in write_buffer.failed}
+
+    def wake(self):
+        """Poll now instead of waiting for the next interval"""
+        self._wake.set()
+
+    async def run(self, submit):
+        """Lease due entries every RETRY_POLL_INTERVAL and pass them to submit(job)"""
+        while True:
+            try:
+                await self.poll(submit)
+            except Exception as e:
+                logging.error(f"Retry poll failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), Config.RETRY_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def poll(self, submit):
+        await self.load()
+        for _ in range(Config.RETRY_BATCH_SIZE):
+            doc = await db.claim_failed_post(self.owner, Config.RETRY_LEASE_SECONDS)
+            if doc is None:
+                break
+            link = doc.get("normalized_link")
+            if not link or not doc.get("topic_url"):
+                # Not enough stored to rebuild the post: dead-letter it
+                await db.reschedule_failed_post(doc["_id"], doc.get("retry_count", 0), doc.get("error_message"))
+                continue
+            if await db.is_file_posted(link):
+                # Posted before this entry was cleaned up (e.g. a restart in between)
+                await db.resolve_failed_post(link)
+                self.owned.discard(link)
+                continue
+            self.owned.add(link)
+            logging.info(f"Retrying {doc['title']} (attempt {doc['retry_count'] + 1})")
+            await submit({
+                "retry_id": doc["_id"],
+                "retry_count": doc["retry_count"],
+                "topic_url": doc["topic_url"],
+                "topic_title": doc.get("topic_title", ""),
+                "title": doc["title"],
+                "link": doc["file_link"],
+                "normalized_link": link,
+                "size": doc["size"],
+            })
+
+    async def failed_again(self, job, error):
+        """Back off a retried job that failed, or dead-letter it after the last attempt"""
+        retry_count = job["retry_count"] + 1
+        if retry_count >= Config.RETRY_MAX_ATTEMPTS:
+            await db.reschedule_failed_post(job["retry_id"], retry_count, str(error))
+            self.progress["dead"] += 1
+            logging.warning(f"Giving up on {job['title']} after {retry_count} attempts: {error}")
+        else:
+            await db.reschedule_failed_post(job["retry_id"], retry_count, str(error), self.next_attempt(retry_count))
+            self.progress["rescheduled"] += 1
+
+    def succeeded(self, job):
+        """A retried job was posted and recorded: drop its entry"""
+        self.owned.discard(job["normalized_link"])
+        self.progress["succeeded"] += 1
+        task = asyncio.create_task(db.resolve_failed_post(job["normalized_link"]))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+# Global retry engine instance
+retry_engine = RetryEngine()
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+from config import Config
+from database import IST
+
+FILES_PER_CYCLE = 2   # new files a cycle should find at the current rate
+RATE_SMOOTHING = 0.3  # weight of the latest cycle in the new-files rate
+
+
+class CrawlScheduler:
+    """Runs the crawl on a cadence measured from cycle start, adapting the interval to activity.
+
+    The interval is the time in which FILES_PER_CYCLE new files are expected at the
+    smoothed rate of new files, clamped to the minimum and maximum: a burst of
+    releases shortens it in proportion, and each idle cycle decays the rate so the
+    interval stretches towards the maximum. A cycle that overruns its interval
+    starts the next one immediately.
+    """
+
+    def __init__(self, min_interval=None, max_interval=None):
+        self.min_interval = min_interval or Config.CRAWL_MIN_INTERVAL
+        self.max_interval = max(self.min_interval, max_interval or Config.CRAWL_MAX_INTERVAL)
+        self.interval = min(max(60, self.min_interval), self.max_interval)
+        self.rate = 0.0          # smoothed new files per minute
+        self.idle_cycles = 0
+        self.cycles = 0
+        self.last_duration = 0.0
+        self.next_run = None     # when the next cycle starts (IST)
+        self._wake = asyncio.Event()
+
+    def record(self, new_files, elapsed):
+        """Fold one cycle's result into the rate and pick the next interval"""
+        self.cycles += 1
+        self.last_duration = elapsed
+        per_minute = new_files * 60 / max(self.interval, elapsed)
+        self.rate = RATE_SMOOTHING * per_minute + (1 - RATE_SMOOTHING) * self.rate
+        self.idle_cycles = 0 if new_files else self.idle_cycles + 1
+        target = FILES_PER_CYCLE * 60 / self.rate if self.rate > 0 else self.max_interval
+        self.interval = min(self.max_interval, max(self.min_interval, target))
+
+    async def run(self, cycle):
+        """Call cycle() forever; it returns the number of new files it found"""
+        while True:
+            started = time.monotonic()
+            try:
+                new_files = await cycle()
+            except Exception as e:
+                logging.error(f"Crawl cycle failed: {e}")
+                new_files = 0
+            self.record(new_files or 0, time.monotonic() - started)
+
+            delay = max(0.0, started + self.interval - time.monotonic())
+            self.next_run = datetime.now(IST) + timedelta(seconds=delay)
+            logging.info(
+                f"Next crawl in {delay:.0f}s (interval {self.interval:.0f}s, "
+                f"{new_files or 0} new, {self.rate:.2f} files/min)"
+            )
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def wake(self):
+        """Start the next cycle now instead of at its scheduled time"""
+        self._wake.set()
+
+    def report(self):
+        """Schedule figures for /stats"""
+        return {
+            "next_run": self.next_run,
+            "next_in": max(0, (self.next_run - datetime.now(IST)).total_seconds()) if self.next_run else None,
+            "interval": self.interval,
+            "rate": self.rate,
+            "idle_cycles": self.idle_cycles,
+            "last_duration": self.last_duration,
+        }
+
+
+# Global crawl scheduler instance
+crawl_scheduler = CrawlScheduler()
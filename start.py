@@ -7,6 +7,17 @@ import pytz
 from datetime import datetime
 from config import Config
 from database import db
+from fetcher import fetcher
+from cache import validator_cache, parse_cache
+from dedup import dedup_filter
+from ratelimit import send_limiter
+from scheduler import crawl_scheduler
+from mirrors import mirror_pool
+from retry import retry_engine
+from coordination import coordinator
+from profiler import cycle_profiler
+from backfill import backfill
+from urllib.parse import urljoin
 
 # State management for settings
 user_states = {}
@@ -26,6 +37,7 @@ START_TEXT = """
 
 # Global bot instance (will be set by bot.py)
 bot_instance = None
+_progress_tasks = set()  # retry progress messages being kept up to date
 
 def set_bot_instance(bot):
     """Set the bot instance for command handlers"""
@@ -62,6 +74,8 @@ async def help_command(client: Client, message: Message):
 • /settings - Bot configuration management
 • /stats - View bot performance statistics
 • /retry_failed - Manage failed posts
+• /profile [N] - Profile the next N crawl cycles
+• /backfill [URL | resume | stop] - Catch up from the forum's listing pages
 • /restart - Restart the bot
 
 📋 <b>Features:</b>
@@ -136,6 +150,49 @@ async def stats_command(client: Client, message: Message):
             
         # Get config for display
         config = await db.get_bot_config()
+        net = fetcher.stats()
+        schedule = crawl_scheduler.report()
+        next_crawl = (
+            f"`{schedule['next_run'].strftime('%H:%M:%S')}` (in `{int(schedule['next_in'])}s`)"
+            if schedule['next_run'] else "`pending`"
+        )
+        pipeline_text = ""
+        if bot_instance:
+            pipeline_text = "\n\n**Pipeline:**\n" + "\n".join(
+                f"• {name.title()}: `{d['queued']}/{d['capacity']}` queued, `{d['busy']}/{d['workers']}` busy, `{d['processed']}` done"
+                for name, d in bot_instance.pipeline.depths().items()
+            )
+        limits_text = f"\n\n**Telegram Rate:**\n• FloodWaits: `{send_limiter.flood_waits}`" + "".join(
+            f"\n• `{chat_id}`: `{round(limit['per_minute'], 1)}`/min"
+            + (f" (paused `{int(limit['paused_for'])}s`)" if limit['paused_for'] else "")
+            for chat_id, limit in send_limiter.report().items()
+        )
+        mirrors = mirror_pool.report(config.get('base_url') if config else None)
+        mirrors_text = "\n\n**Mirrors:**" + "".join(
+            f"\n• {'✅' if m['healthy'] else '❌'} `{m['mirror']}`"
+            + (f" `{m['latency'] * 1000:.0f} ms`" if m['latency'] is not None else " `not probed`")
+            + (" (active)" if m['mirror'] == mirror_pool.active else "")
+            for m in mirrors
+        ) if len(mirrors) > 1 else ""
+        coordination_text = ""
+        if coordinator.enabled:
+            coord = await coordinator.report()
+            claims = coord["claims"]
+            coordination_text = (
+                f"\n\n**Coordination:**\n"
+                f"• Instance: `{coord['owner']}`\n"
+                f"• Shared Queue: `{claims.get('queued', 0)}` queued, `{claims.get('leased', 0)}` leased, "
+                f"`{claims.get('uploading', 0)}` uploading\n"
+                f"• This Instance: `{coord.get('posted', 0)}` posted, `{coord.get('lost', 0)}` lost to others, "
+                f"`{coord.get('interrupted', 0)}` interrupted uploads found"
+            )
+        dedup = dedup_filter.report()
+        dedup_text = (
+            f"\n\n**Dedup Filter:**\n"
+            f"• Links: `{dedup['links']}` in `{dedup['memory_kib']} KiB`\n"
+            f"• False Positives: `{dedup['observed_fpr']:.3%}` observed / `{dedup['estimated_fpr']:.3%}` expected\n"
+            f"• DB Lookups Skipped: `{dedup['skipped_lookups']}`"
+        ) if dedup else ""
             
         text = f"""📊 **Bot Statistics**
 
@@ -152,7 +209,19 @@ async def stats_command(client: Client, message: Message):
 **Configuration:**
 • Base URL: `{config.get('base_url', 'Not set') if config else 'Not loaded'}`
 • Last Updated: `{config.get('last_updated', 'Unknown') if config else 'Unknown'}`
-• Bot Status: ✅ Running"""
+• Bot Status: ✅ Running
+
+**Crawler:**
+• Next Crawl: {next_crawl}
+• Interval: `{int(schedule['interval'])}s` (last cycle took `{schedule['last_duration']:.1f}s`)
+• New Files: `{schedule['rate']:.2f}`/min, idle for `{schedule['idle_cycles']}` cycles
+
+**Network:**
+• Requests: `{net['requests']}`
+• Connections Opened: `{net['connections_opened']}` (reused: `{net['connections_reused']}`)
+• DNS Lookups: `{net['dns_lookups']}` (cached: `{net['dns_cache_hits']}`)
+• Not Modified (304): `{validator_cache.stats['not_modified']}`
+• Parse Cache: `{parse_cache.stats['hits']}` hits / `{parse_cache.stats['misses']}` misses{mirrors_text}{pipeline_text}{coordination_text}{limits_text}{dedup_text}"""
         
         await message.reply_text(text)
         
@@ -167,9 +236,9 @@ async def retry_failed_command(client: Client, message: Message):
         return
         
     try:
-        failed = await db.get_failed_posts()
+        counts = await db.count_failed_posts()
         
-        if not failed:
+        if not counts:
             await message.reply_text("✅ No failed posts to retry!")
             return
             
@@ -181,7 +250,10 @@ async def retry_failed_command(client: Client, message: Message):
         
         text = f"""⚠️ **Failed Posts Management**
 
-**Failed Posts Count:** `{len(failed)}`
+**Failed Posts Count:** `{sum(counts.values())}`
+• Waiting to Retry: `{counts.get('pending', 0)}`
+• Retrying Now: `{counts.get('leased', 0)}`
+• Gave Up: `{counts.get('dead', 0)}`
 
 Select an action:"""
         
@@ -192,6 +264,77 @@ Select an action:"""
         await message.reply_text("❌ Failed to load failed posts")
 
 
+async def profile_command(client: Client, message: Message):
+    """Handle /profile [N] command"""
+    if message.from_user.id != Config.BOT_OWNER:
+        return
+
+    try:
+        cycles = int(message.command[1]) if len(message.command) > 1 else 1
+    except ValueError:
+        await message.reply_text("❌ Usage: /profile [number of cycles]")
+        return
+    cycles = max(1, min(cycles, 10))
+
+    if not cycle_profiler.request(cycles, message.chat.id):
+        await message.reply_text(
+            f"⏳ A profile is already running ({cycle_profiler.remaining} cycle(s) left). Try again once its report is in."
+        )
+        return
+    crawl_scheduler.wake()
+    await message.reply_text(f"🔬 Profiling the next {cycles} crawl cycle(s), starting now. Hotspots will be sent here.")
+
+
+async def backfill_command(client: Client, message: Message):
+    """Handle /backfill [URL | resume | stop] command"""
+    if message.from_user.id != Config.BOT_OWNER:
+        return
+
+    arg = message.command[1] if len(message.command) > 1 else None
+    if arg is None:
+        if not backfill.running:
+            await backfill.load()  # show the checkpoint, e.g. one left by another instance
+        await message.reply_text(
+            f"🗂 **Backfill**\n\n{backfill.summary()}\n\n"
+            "Usage: `/backfill <forum or listing URL>` to start, `/backfill resume`, `/backfill stop`"
+        )
+        return
+    if arg == "stop":
+        if not backfill.running:
+            await message.reply_text("ℹ️ No backfill is running.")
+            return
+        backfill.stop()
+        await message.reply_text("⏸ Backfill will pause after the current step; `/backfill resume` continues it.")
+        return
+    if backfill.running:
+        await message.reply_text("ℹ️ A backfill is already running. `/backfill stop` pauses it.")
+        return
+    if not bot_instance:
+        await message.reply_text("❌ Bot is still starting, try again shortly.")
+        return
+
+    if arg == "resume":
+        await backfill.load()
+        if backfill.resume(*bot_instance.backfill_hooks()):
+            await message.reply_text(f"▶️ Backfill resumed with a fresh budget.\n\n{backfill.summary()}")
+        else:
+            await message.reply_text("ℹ️ There is no paused backfill to resume.")
+        return
+
+    # A path like /index.php?/forums/forum/11-... is taken relative to the base URL
+    config = await db.get_bot_config()
+    start_url = urljoin(config.get("base_url", "") if config else "", arg)
+    if not start_url.startswith("http"):
+        await message.reply_text("❌ Usage: /backfill <forum or listing URL>")
+        return
+    backfill.start(start_url, *bot_instance.backfill_hooks())
+    await message.reply_text(
+        f"🗂 Backfill started from `{start_url}`.\n"
+        f"Budget: `{Config.BACKFILL_MAX_REQUESTS}` requests or `{Config.BACKFILL_MAX_SECONDS // 60}` minutes; "
+        f"files are queued at `{Config.BACKFILL_RATE}`/min. You'll get a message when it stops."
+    )
+
+
 async def restart_command(client: Client, message: Message):
     """Handle /restart command"""
     if message.from_user.id != Config.BOT_OWNER:
@@ -287,6 +430,32 @@ async def handle_settings_input(client: Client, message: Message):
         await message.reply_text("❌ An error occurred while updating settings")
 
 
+async def show_retry_progress(client: Client, message: Message, total, interval=5, timeout=900):
+    """Edit the retry panel in place until every requeued post has had an attempt"""
+    start_counts = retry_engine.progress.copy()
+    deadline = asyncio.get_running_loop().time() + timeout
+    last_text = None
+    while True:
+        done = {key: retry_engine.progress[key] - start_counts[key] for key in ("succeeded", "rescheduled", "dead")}
+        attempted = min(sum(done.values()), total)
+        finished = attempted >= total or asyncio.get_running_loop().time() >= deadline
+        text = f"""{'✅ **Retry Finished**' if finished else '🔄 **Retrying Failed Posts**'}
+
+• Attempted: `{attempted}/{total}`
+• Posted: `{done['succeeded']}`
+• Rescheduled: `{done['rescheduled']}`
+• Gave Up: `{done['dead']}`"""
+        if text != last_text:
+            try:
+                await send_limiter.call(message.chat.id, client.edit_message_text, message.id, text)
+                last_text = text
+            except Exception as e:
+                logging.error(f"Failed to update retry progress: {e}")
+        if finished:
+            return
+        await asyncio.sleep(interval)
+
+
 async def callback_query_handler(client: Client, callback_query: CallbackQuery):
     """Handle callback queries for settings"""
     if callback_query.from_user.id != Config.BOT_OWNER:
@@ -330,7 +499,8 @@ async def callback_query_handler(client: Client, callback_query: CallbackQuery):
         await callback_query.message.edit_text(
             f"Send the new caption template (or /cancel to abort):\n\n"
             f"Current:\n`{current_caption}`\n\n"
-            "Available variables (optional): `{title}`, `{size}`, `{quality}`\n\n"
+            "Available variables (optional): `{title}`, `{size}`, `{quality}`, `{resolution}`, "
+            "`{source}`, `{codec}`, `{languages}`, `{season}`, `{episode}`\n\n"
             "Example:\n`**🎬 {title}**\n\n**📦 {size} | 🎚 {quality}**\n\n**🔥 Uploaded By ~ @E4Error**`"
         )
         
@@ -344,10 +514,13 @@ async def callback_query_handler(client: Client, callback_query: CallbackQuery):
         )
         
     elif data == "retry_all_failed":
-        failed = await db.get_failed_posts()
-        if failed:
-            await callback_query.message.edit_text("🔄 Retrying all failed posts...")
-            # Implement retry logic here
+        queued = await db.requeue_failed_posts()
+        if queued:
+            await callback_query.message.edit_text(f"🔄 Retrying {queued} failed posts...")
+            retry_engine.wake()
+            task = asyncio.create_task(show_retry_progress(client, callback_query.message, queued))
+            _progress_tasks.add(task)
+            task.add_done_callback(_progress_tasks.discard)
             await callback_query.answer("Retry started")
         else:
             await callback_query.answer("No failed posts to retry")
@@ -366,6 +539,12 @@ async def callback_query_handler(client: Client, callback_query: CallbackQuery):
             except:
                 pass  # Ignore errors if message deletion fails
             
+            # Save buffered posts and release claims first - exec skips stop()
+            try:
+                await client.shutdown()
+            except Exception as e:
+                logging.error(f"Cleanup before restart failed: {e}")
+
             # Restart the bot
             import os
             import sys
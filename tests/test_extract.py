@@ -0,0 +1,64 @@
+"""The streaming extractor must give the same results as the BeautifulSoup one on real-world markup."""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import extract  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+NESTED = (
+    "<html><body><p>"
+    "<a href='/forums/topic/1-film/'><span>Film</span> <b>(2024)</b> Tamil</a>"
+    "<a href='/forums/topic/1-film/'><i>2 replies</i></a>"
+    "</p><div><a data-fileext='torrent' href='/applications/core/interface/file/attachment.php?id=1'>"
+    "<span>www.1TamilMV.se - Film (2024) 1080p - 2.1GB.torrent</span></a></div></body></html>"
+)
+
+
+VARIANTS = {
+    "plain": lambda html: html,
+    "leading comment": lambda html: "<!-- cached page -->" + html,
+    "trailing text": lambda html: html + "\n  stray text",
+    "trailing script": lambda html: html + "<script>var x = 1;</script>",
+}
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_nested_anchor_text(variant):
+    html = VARIANTS[variant](NESTED)
+    assert extract.topic_links(html, mode="stream") == extract.topic_links(html, mode="soup")
+    assert extract.torrent_anchors(html, mode="stream") == extract.torrent_anchors(html, mode="soup")
+    assert extract.topic_links(html, mode="stream")[0][1] == "Film(2024)Tamil | 2 replies"
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_topic_page(variant):
+    html = VARIANTS[variant](load("topic.html"))
+    anchors = extract.torrent_anchors(html, mode="stream")
+    assert anchors and anchors == extract.torrent_anchors(html, mode="soup")
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_homepage(variant):
+    html = VARIANTS[variant](load("homepage.html"))
+    links = extract.topic_links(html, mode="stream")
+    assert links and links == extract.topic_links(html, mode="soup")
+
+
+@pytest.mark.parametrize("mode", ["stream", "soup"])
+def test_topic_links_merge_reply_links(mode):
+    links = extract.topic_links(load("homepage.html"), mode=mode)
+    assert len({extract.topic_key(href) for href, _ in links}) == len(links)
+    assert not any("do=" in href for href, _ in links)
+    assert links[0][1].endswith(" | 23 replies")
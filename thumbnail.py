@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+from config import Config
+from fetcher import fetcher
+
+RETRY_AFTER = 600  # seconds before a failed thumbnail download is tried again
+
+
+class ThumbnailCache:
+    """Thumbnail kept on disk under its content hash, downloaded again only when its URL changes.
+
+    Uploads are given the file path, so every send reads the image from the start
+    (a shared BytesIO would be left at EOF after the first upload).
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or Config.THUMBNAIL_DIR
+        self.index_path = os.path.join(self.directory, "index.json")
+        self.url = None
+        self.path = None
+        self._retry_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _cached_path(self, url):
+        """Path from the on-disk index if it was stored for this URL and is still intact"""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            path = os.path.join(self.directory, index["file"])
+            if index["url"] != url:
+                return None
+            with open(path, "rb") as f:
+                if hashlib.sha256(f.read()).hexdigest() != index["sha256"]:
+                    return None
+            return path
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _store(self, url, content):
+        """Write the image under its hash, point the index at it and drop the previous one"""
+        os.makedirs(self.directory, exist_ok=True)
+        digest = hashlib.sha256(content).hexdigest()
+        filename = f"{digest}.jpg"
+        path = os.path.join(self.directory, filename)
+        if not os.path.exists(path):
+            with open(path + ".tmp", "wb") as f:
+                f.write(content)
+            os.replace(path + ".tmp", path)
+        with open(self.index_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"url": url, "sha256": digest, "file": filename}, f)
+        os.replace(self.index_path + ".tmp", self.index_path)
+        for name in os.listdir(self.directory):
+            if name.endswith(".jpg") and name != filename:
+                os.remove(os.path.join(self.directory, name))
+        return path
+
+    async def get(self, url):
+        """Local path of the thumbnail for url, or None if it isn't available"""
+        if url == self.url and (self.path or time.monotonic() < self._retry_at):
+            return self.path
+        async with self._lock:
+            if url == self.url and (self.path or time.monotonic() < self._retry_at):
+                return self.path
+            path = await asyncio.to_thread(self._cached_path, url)
+            if path:
+                logging.info("Thumbnail loaded from disk cache")
+            else:
+                try:
+                    resp = await fetcher.get(url, timeout=10)
+                    resp.raise_for_status()
+                    path = await asyncio.to_thread(self._store, url, resp.content)
+                    logging.info("Thumbnail downloaded successfully")
+                except Exception as e:
+                    logging.error(f"Failed to download thumbnail: {e}")
+                    self._retry_at = time.monotonic() + RETRY_AFTER
+            self.url, self.path = url, path
+            return path
+
+
+# Global thumbnail cache instance
+thumbnail_cache = ThumbnailCache()
@@ -0,0 +1,115 @@
+import itertools
+import json
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from config import Config
+from database import IST
+
+
+class CycleTrace:
+    """Timings for one crawl cycle: named spans plus one entry per fetched topic"""
+
+    def __init__(self, cycle=0):
+        self.cycle = cycle
+        self.started = datetime.now(IST)
+        self._start = time.perf_counter()
+        self.spans = {}
+        self.topics = []
+        self.fields = {}
+
+    @contextmanager
+    def span(self, name):
+        """Time a with block, in milliseconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    def topic(self, **fields):
+        self.topics.append(fields)
+
+    def record(self, **fields):
+        self.fields.update(fields)
+
+    def to_dict(self):
+        return {
+            "event": "cycle",
+            "cycle": self.cycle,
+            "started": self.started,
+            "total_ms": round((time.perf_counter() - self._start) * 1000, 2),
+            "spans_ms": self.spans,
+            **self.fields,
+            "topics": self.topics,
+        }
+
+
+@contextmanager
+def job_timer(job, name):
+    """Time a pipeline stage for one file, kept on the job for its trace line"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        job.setdefault("timings", {})[name] = round((time.perf_counter() - start) * 1000, 2)
+
+
+class TraceLog:
+    """JSON-lines trace of crawl cycles and pipeline files, in a size-rotated local file"""
+
+    def __init__(self, path=None, max_bytes=None, backups=None):
+        self.path = Config.TRACE_LOG_PATH if path is None else path
+        self.max_bytes = max_bytes or Config.TRACE_LOG_MAX_BYTES
+        self.backups = Config.TRACE_LOG_BACKUPS if backups is None else backups
+        self._cycles = itertools.count(1)
+        self._logger = None
+
+    @property
+    def logger(self):
+        if self._logger is None:
+            self._logger = logging.getLogger("tmv.trace")
+            self._logger.propagate = False  # keep trace lines out of the console log
+            self._logger.setLevel(logging.INFO)
+            handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(handler)
+        return self._logger
+
+    def new_cycle(self):
+        return CycleTrace(next(self._cycles))
+
+    def write(self, record):
+        if not self.path:
+            return
+        try:
+            self.logger.info(json.dumps(record, default=str, ensure_ascii=False))
+        except Exception as e:
+            logging.error(f"Failed to write trace: {e}")
+
+    def cycle(self, trace):
+        self.write(trace.to_dict())
+
+    def file(self, job, result, error=None):
+        """One line per file leaving the pipeline, with its per-stage timings"""
+        record = {
+            "event": "file",
+            "cycle": job.get("cycle"),
+            "at": datetime.now(IST),
+            "result": result,
+            "title": job.get("title"),
+            "link": job.get("link"),
+            "topic_url": job.get("topic_url"),
+            "retry": job.get("retry_count"),
+            "timings_ms": job.get("timings", {}),
+        }
+        if error is not None:
+            record["error"] = str(error)
+        self.write(record)
+
+
+# Global trace log instance
+trace_log = TraceLog()
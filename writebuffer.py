@@ -0,0 +1,195 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from config import Config
+from database import db, IST
+from metrics import stage_seconds
+
+DUPLICATE_KEY = 11000
+
+
+class WriteBuffer:
+    """Write-behind buffer for per-file results, flushed as unordered bulk writes.
+
+    Posted files are only added once Telegram has acknowledged the upload, and their
+    callback runs after the batch holding them is written, so callers keep the link
+    protected against reposting until then. A batch that fails outright stays
+    buffered and is retried on the next flush.
+    """
+
+    def __init__(self, max_ops=None, interval=None):
+        self.max_ops = max_ops or Config.WRITE_BATCH_SIZE
+        self.interval = interval or Config.WRITE_FLUSH_INTERVAL
+        self.posted = []   # (posted_files document, callback)
+        self.failed = []   # failed documents
+        self.counters = Counter()
+        self._lock = asyncio.Lock()
+        self._flush_task = None
+        self.stats = {"flushes": 0, "docs_written": 0, "write_errors": 0}
+
+    def __len__(self):
+        return len(self.posted) + len(self.failed)
+
+    def add_posted(self, topic_url, topic_title, file_link, file_title, size, normalized_link,
+                   infohash=None, duplicate=False, on_written=None):
+        """Buffer a posted file; on_written(ok) is called once its write succeeded or failed.
+
+        duplicate marks a link whose torrent was already posted under another link: it is
+        recorded so it isn't downloaded again, but doesn't count towards its topic.
+        """
+        doc = {
+            "_id": normalized_link or file_link,
+            "file_link": file_link,
+            "file_title": file_title,
+            "size": size,
+            "topic_url": topic_url,
+            "topic_title": topic_title,
+            "posted_at": datetime.now(IST),
+        }
+        if infohash:
+            doc["infohash"] = infohash
+        if duplicate:
+            doc["duplicate"] = True
+        self.posted.append((doc, on_written))
+        self._maybe_flush()
+
+    def add_failed(self, file_link, title, size, error_message, topic_url=None, topic_title=None,
+                   normalized_link=None, next_attempt_at=None):
+        """Buffer a failed post for the retry queue, with what is needed to post it again"""
+        self.failed.append({
+            "file_link": file_link,
+            "title": title,
+            "size": size,
+            "error_message": error_message,
+            "failed_at": datetime.now(IST),
+            "topic_url": topic_url,
+            "topic_title": topic_title,
+            "normalized_link": normalized_link or file_link,
+            "retry_count": 0,
+            "status": "pending",
+            "next_attempt_at": next_attempt_at or datetime.now(IST),
+        })
+        self._maybe_flush()
+
+    def count(self, **counters):
+        """Add to today's bot_stats counters, written with the next flush"""
+        self.counters.update(counters)
+
+    def _maybe_flush(self):
+        if len(self) >= self.max_ops and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    async def run(self):
+        """Flush on the time threshold; size-triggered flushes happen as results arrive"""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self):
+        """Write everything buffered so far"""
+        async with self._lock:
+            posted, self.posted = self.posted, []
+            failed, self.failed = self.failed, []
+            counters, self.counters = +self.counters, Counter()  # unary + drops zero counts
+            if not (posted or failed or counters):
+                return
+            self.stats["flushes"] += 1
+            if posted:
+                await self._write_posted(posted)
+            if failed:
+                await self._write_failed(failed)
+            if counters:
+                await db.update_daily_stats(**counters)
+
+    async def _write_posted(self, posted):
+        ops = [
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {"$setOnInsert": {key: value for key, value in doc.items() if key not in ("_id", "topic_title")}},
+                upsert=True
+            )
+            for doc, _ in posted
+        ]
+        try:
+            with stage_seconds.time("mongo_write"):
+                result = await db.db.posted_files.bulk_write(ops, ordered=False)
+            upserted, errors = set(result.upserted_ids), {}
+        except BulkWriteError as e:
+            # Unordered, so every other op was still applied; a duplicate key means it already exists
+            upserted = {item["index"] for item in e.details.get("upserted", [])}
+            errors = {err["index"]: err for err in e.details["writeErrors"] if err["code"] != DUPLICATE_KEY}
+        except Exception as e:
+            logging.error(f"Failed to write {len(posted)} posted files, keeping them buffered: {e}")
+            self.posted[:0] = posted
+            return
+
+        self.stats["docs_written"] += len(posted) - len(errors)
+        self.stats["write_errors"] += len(errors)
+        for index, err in errors.items():
+            logging.error(f"Failed to record posted file {posted[index][0]['file_title']}: {err.get('errmsg')}")
+
+        # One topic update per topic, counting only files that were new
+        topics = {}
+        for index, (doc, _) in enumerate(posted):
+            if index in errors or doc.get("duplicate"):
+                continue
+            topic = topics.setdefault(doc["topic_url"], {"title": doc["topic_title"], "last_updated": doc["posted_at"], "new": 0})
+            topic["title"], topic["last_updated"] = doc["topic_title"], max(topic["last_updated"], doc["posted_at"])
+            topic["new"] += index in upserted
+        if topics:
+            try:
+                with stage_seconds.time("mongo_write"):
+                    await db.db.topics.bulk_write([
+                        UpdateOne(
+                            {"topic_url": url},
+                            {"$set": {"title": t["title"], "last_updated": t["last_updated"]}, "$inc": {"files_count": t["new"]}},
+                            upsert=True
+                        )
+                        for url, t in topics.items()
+                    ], ordered=False)
+            except Exception as e:
+                # posted_files is what dedup relies on; topic counters are informational
+                logging.error(f"Failed to update topics: {e}")
+
+        for index, (doc, on_written) in enumerate(posted):
+            if on_written:
+                on_written(index not in errors)
+        logging.info(f"Recorded {len(posted) - len(errors)} posted files across {len(topics)} topics")
+
+    async def _write_failed(self, failed):
+        # One retry entry per link; a link that is already queued only gets its latest error
+        ops = [
+            UpdateOne(
+                {"normalized_link": doc["normalized_link"]},
+                {
+                    "$set": {"error_message": doc["error_message"], "failed_at": doc["failed_at"]},
+                    "$setOnInsert": {
+                        key: value for key, value in doc.items()
+                        if key not in ("normalized_link", "error_message", "failed_at")
+                    }
+                },
+                upsert=True
+            )
+            for doc in failed
+        ]
+        try:
+            with stage_seconds.time("mongo_write"):
+                await db.db.failed.bulk_write(ops, ordered=False)
+            self.stats["docs_written"] += len(failed)
+            logging.info(f"Saved {len(failed)} failed posts")
+        except BulkWriteError as e:
+            self.stats["docs_written"] += len(failed) - len(e.details["writeErrors"])
+            self.stats["write_errors"] += len(e.details["writeErrors"])
+            logging.error(f"Failed to save {len(e.details['writeErrors'])} failed posts")
+        except Exception as e:
+            logging.error(f"Failed to save {len(failed)} failed posts, keeping them buffered: {e}")
+            self.failed[:0] = failed
+
+
+# Global write buffer instance
+write_buffer = WriteBuffer()